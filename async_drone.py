@@ -0,0 +1,139 @@
+"""
+asyncio flavour of MyDrone.
+
+Every move is a coroutine which returns when the control loop has sent its last command,
+so missions can be written as plain async functions and composed with asyncio.gather/wait_for,
+while navdata is consumed in the same event loop.
+
+Example:
+    async def mission(drone):
+        await drone.takeoff()
+        await drone.forward(0.1, 1000)
+        await asyncio.wait_for(drone.circle(), timeout=10)
+        await drone.land()
+
+    asyncio.run(mission(AsyncDrone()))
+"""
+import asyncio
+
+
+class AsyncDrone:
+    """
+    Wrap a DroneCore(headless by default) or MyDrone,moves are queued in its control loop in the order they are awaited
+
+    Notes:
+    * Awaiting a move returns True if it is done,False if it was cancelled by land()
+    * Cancelling an awaiting move(e.g. wait_for timeout) stops the control loop,UAV hovers
+    """
+    def __init__(self, drone=None):
+        if drone is None:
+            from core import DroneCore
+            drone = DroneCore()
+        self.drone = drone
+
+    async def _wait(self, future):
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self.drone.loop.cancel()
+            raise
+
+    # Taking off and landing
+# ------------------------------------------------------
+    async def takeoff(self, timeout=10):
+        """True once UAV hovers steadily,False on timeout"""
+        return await asyncio.wrap_future(self.drone.takeoff(timeout))
+
+    async def land(self, timeout=10):
+        return await asyncio.wrap_future(self.drone.land(timeout))
+
+    # Basic moving
+# ------------------------------------------------------
+    async def play(self, schedule, settle=0):
+        return await self._wait(self.drone.play(schedule, settle))
+
+    async def free_move(self, vx, vy, vz, w, ms_period):
+        return await self._wait(self.drone.free_move(vx, vy, vz, w, ms_period))
+
+    async def settle(self, ms_period=1500):
+        return await self._wait(self.drone.settle(ms_period))
+
+    async def turn(self, w, ms_period=1000):
+        return await self._wait(self.drone.turn(w, ms_period))
+
+    async def right(self, v, ms_period=1000):
+        return await self._wait(self.drone.right(v, ms_period))
+
+    async def forward(self, v=0.1, ms_period=1000):
+        return await self._wait(self.drone.forward(v, ms_period))
+
+    async def climb(self, v, ms_period=1000):
+        return await self._wait(self.drone.climb(v, ms_period))
+
+    async def arc_move(self, v, r, deg, start_angle=0, vertical=False):
+        return await self._wait(self.drone.arc_move(v, r, deg, start_angle, vertical))
+
+    async def function_move(self, f_vx, f_vy, f_vz, ms_period):
+        return await self._wait(self.drone.function_move(f_vx, f_vy, f_vz, ms_period))
+
+    async def curve_move(self, x, y, z, ms_period, v=1.0):
+        return await self._wait(self.drone.curve_move(x, y, z, ms_period, v))
+
+    async def waypoint_move(self, points, v=0.2, accel=1.0):
+        return await self._wait(self.drone.waypoint_move(points, v, accel))
+
+    async def run_mission(self, source, lookahead=2):
+        return await self._wait(self.drone.run_mission(source, lookahead))
+
+    async def move_seq(self, seq: list, no_pause=False):
+        """
+        Await a list of coroutine functions one by one,e.g. [lambda: drone.forward(0.1), ...]
+        The next move is queued the moment the previous one is done,no polling in between
+        """
+        for i, move in enumerate(seq):
+            if i and not no_pause:
+                await self.settle(1500)  # this is a pause make the UAV stable before next move
+            if not await move():
+                return False
+        return True
+
+    # Shape moving
+# ------------------------------------------------------
+    async def square(self, v=0.2, ms_period=600):
+        return await self._wait(self.drone.square(v, ms_period))
+
+    async def triangle(self, v=0.2, ms_period=800):
+        return await self._wait(self.drone.triangle(v, ms_period))
+
+    async def circle(self, v=0.1, r=0.6, vertical=False):
+        return await self._wait(self.drone.circle(v, r, vertical))
+
+    async def two_circle(self, v=0.1, r=0.6, vertical=False, pause=1000, blend=0):
+        return await self._wait(self.drone.two_circle(v, r, vertical, pause, blend))
+
+    async def number_eight(self, pause=1000, blend=0):
+        return await self._wait(self.drone.number_eight(pause, blend))
+
+    async def helix(self, v=0.1, r=0.6, up=0.2, turns=1):
+        return await self._wait(self.drone.helix(v, r, up, turns))
+
+    async def spiral_up(self):
+        return await self._wait(self.drone.spiral_up())
+
+    async def star(self):
+        return await self._wait(self.drone.star())
+
+    async def four_leaves(self):
+        return await self._wait(self.drone.four_leaves())
+
+    # Navdata
+# ------------------------------------------------------
+    async def navdata(self, ms_interval=50):
+        """
+        Yield the latest navdata every ms_interval,e.g.
+            async for nav in drone.navdata():
+                print(nav.demo.altitude)
+        """
+        while True:
+            yield self.drone.navdata
+            await asyncio.sleep(ms_interval / 1000)
@@ -0,0 +1,200 @@
+"""
+Benchmark the shapes and the control loop on the simulated drone.
+
+For every shape it reports
+* mission_ms: wall time from submitting the shape to its last command(settle included)
+* lateness: scheduling jitter of the ticks,in ms
+* commands_per_s: AT commands received by the drone per second
+* cpu: CPU time of the control loop per tick,in ms
+* path_error: distance from the simulated route(sampled on every tick) to the ideal route of the schedule,in m
+* closure_error: distance between where UAV comes to rest and where the schedule ends,in m
+
+the cost per navdata packet of decoding it in full(pyardrone) and of reading the fields the core subscribes to
+(see telemetry.py),and the startup time of a bare run: a fresh interpreter which imports the core,makes a DroneCore
+and plans a mission,without flying it. It should stay under STARTUP_BUDGET_MS,
+which holds as long as pyardrone,tkinter and http.server are only imported when used.
+
+Results are written as JSON so that runs of different versions can be compared.
+
+Usage:
+    python bench.py
+    python bench.py --out before.json --shapes circle square
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import trajectory
+from core import DroneCore
+from sim import SimDrone
+
+STARTUP_BUDGET_MS = 250
+STARTUP_SCRIPT = ("import core, mission; d = core.DroneCore(); mission.compile_mission(%r); d.shutdown()"
+                  % os.path.join("missions", "tour.jsonl"))
+SHAPES = ["square", "triangle", "circle", "two_circle", "number_eight", "spiral_up", "star", "four_leaves"]
+
+
+def path_error(actual, ideal, chunk=256):
+    """Distance from every actual point to the nearest segment of the ideal route"""
+    if len(ideal) < 2:
+        return np.linalg.norm(actual - ideal[0], axis=1)
+    a = ideal[:-1]
+    ab = ideal[1:] - a
+    length = (ab ** 2).sum(axis=1)
+    length[length == 0] = 1
+    err = np.empty(len(actual))
+    for i in range(0, len(actual), chunk):
+        p = actual[i:i + chunk, None, :]
+        s = np.clip(((p - a) * ab).sum(axis=2) / length, 0, 1)
+        err[i:i + chunk] = np.linalg.norm(p - (a + s[..., None] * ab), axis=2).min(axis=1)
+    return err
+
+
+def bench_shape(name, rate=20, adaptive=False, **sim_kwargs):
+    sim = SimDrone(**sim_kwargs)
+    drone = DroneCore(link=sim, rate=rate, adaptive=adaptive)
+    drone.takeoff().result()
+    drone.loop.reset_stats()
+    commands = sim.commands
+    # Where UAV is on every tick,the trace of the drone has a point per command received,few once they are coalesced
+    positions = []
+    send = drone.loop.send
+    drone.loop.send = lambda row: (send(row), positions.append(sim.position))
+
+    start = time.monotonic()
+    future = getattr(drone, name)()
+    schedule = drone.memo["schedule"]
+    future.result()
+    mission = time.monotonic() - start
+    stats = drone.loop.stats()
+    flown = len(positions)
+    drone.settle(5 * sim.tau).result()  # UAV still drifts on for a few tau after the last command
+    rest = np.array(sim.position)
+    drone.shutdown()
+
+    actual = np.array(positions[:flown]) - positions[0]
+    ideal = trajectory.path(schedule, sim.max_v, sim.vertical_gain)
+    err = path_error(actual, ideal)
+    return {
+        "mission_ms": mission * 1000,
+        "schedule_ms": float(trajectory.duration(schedule)),
+        "ticks": stats["ticks"],
+        "skipped": stats["skipped"],
+        "lateness_mean_ms": stats["mean_lateness"],
+        "lateness_p99_ms": stats["p99_lateness"],
+        "lateness_max_ms": stats["max_lateness"],
+        "commands_per_s": (sim.commands - commands) / mission,
+        "cpu_per_tick_mean_ms": stats["mean_cpu"],
+        "cpu_per_tick_max_ms": stats["max_cpu"],
+        "path_error_mean_m": float(err.mean()),
+        "path_error_max_m": float(err.max()),
+        "closure_error_m": float(np.linalg.norm(rest - positions[0] - ideal[-1])),
+    }
+
+
+def bench_startup(runs=5):
+    """
+    Wall time of STARTUP_SCRIPT in a fresh interpreter,the best and the median of 'runs'
+    Also tells which of the heavy modules got imported on the way
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    script = STARTUP_SCRIPT + "; import sys; print(' '.join(m for m in %r if m in sys.modules))" \
+        % (("pyardrone", "tkinter", "http.server"),)
+    times = []
+    for _ in range(runs):
+        start = time.monotonic()
+        out = subprocess.check_output([sys.executable, "-c", script], cwd=here, text=True)
+        times.append((time.monotonic() - start) * 1000)
+    times.sort()
+    return {
+        "startup_best_ms": times[0],
+        "startup_median_ms": times[len(times) // 2],
+        "budget_ms": STARTUP_BUDGET_MS,
+        "within_budget": times[len(times) // 2] <= STARTUP_BUDGET_MS,
+        "heavy_imports": out.splitlines()[-1].split(),
+    }
+
+
+def bench_navdata(packets=20000):
+    """Microseconds per packet: pyardrone's full decode,telemetry's feed and a read by the control tick"""
+    from pyardrone.navdata import NavData
+    from core import NAVDATA_FIELDS
+    from telemetry import Telemetry, encode
+    data = encode(1, 1, {"demo": {"vx": 100.0, "vy": -50.0, "vz": 10.0, "psi": 90000.0, "altitude": 120}})
+    telemetry = Telemetry()
+    sub = telemetry.subscribe(*NAVDATA_FIELDS)
+
+    def per_packet(func):
+        start = time.perf_counter()
+        for _ in range(packets):
+            func()
+        return (time.perf_counter() - start) / packets * 1e6
+
+    return {
+        "decode_us": per_packet(lambda: NavData(data)),
+        "feed_us": per_packet(lambda: telemetry.feed(data, 0.0)),
+        "read_us": per_packet(sub.read),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", default="bench_results.json", help="where the JSON results go")
+    parser.add_argument("--shapes", nargs="+", default=SHAPES, choices=SHAPES)
+    parser.add_argument("--tau", type=float, default=200, help="lag of the simulated drone,in ms")
+    parser.add_argument("--rate", type=float, default=20, help="commands per second of the control loop")
+    parser.add_argument("--adaptive", action="store_true", help="adapt the rate to the change of speed")
+    parser.add_argument("--startup-runs", type=int, default=5, help="fresh interpreters timed for the startup")
+    args = parser.parse_args()
+
+    startup = bench_startup(args.startup_runs)
+    print("startup       %8.0fms  (best %.0fms,budget %dms)%s%s"
+          % (startup["startup_median_ms"], startup["startup_best_ms"], STARTUP_BUDGET_MS,
+             "" if startup["within_budget"] else "  OVER BUDGET",
+             "  imports " + ",".join(startup["heavy_imports"]) if startup["heavy_imports"] else ""))
+
+    navdata = bench_navdata()
+    print("navdata       decode %.1fus/packet,subscribed fields %.1fus + %.1fus per read"
+          % (navdata["decode_us"], navdata["feed_us"], navdata["read_us"]))
+
+    results = {}
+    for name in args.shapes:
+        r = results[name] = bench_shape(name, args.rate, args.adaptive, tau=args.tau)
+        print("%-13s %8.0fms  lateness p99 %6.2fms  %5.1f cmd/s  cpu %6.3fms/tick  path error %.3fm"
+              % (name, r["mission_ms"], r["lateness_p99_ms"], r["commands_per_s"],
+                 r["cpu_per_tick_mean_ms"], r["path_error_mean_m"]))
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "tau_ms": args.tau,
+            "rate": args.rate,
+            "adaptive": args.adaptive,
+        },
+        "startup": startup,
+        "navdata": navdata,
+        "shapes": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Results written to %s" % args.out)
+
+
+if __name__ == '__main__':
+    main()
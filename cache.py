@@ -0,0 +1,146 @@
+"""
+Cache of compiled schedules,so pressing the same shape button twice doesn't compile it twice.
+
+Two tiers:
+* memory: an LRU of the latest schedules
+* disk(optional): one .npy file per schedule,loaded memory-mapped,
+  so a restarted controller gets a complex mission without compiling nor reading it all
+
+Entries are keyed on the shape name and its parameters,and grouped by calibration
+(max_v, max_w, rate...). When the calibration changes,the memory tier is dropped.
+On disk each calibration has a directory of its own,the least recently used ones beyond 'calibrations' are removed.
+Only the files the cache wrote(16 hex digits and .npy) are ever deleted,the directory may be shared with others.
+
+get() is thread-safe,moves are started from the window and from the control loop(see DroneCore.move_seq).
+Compiling is done without the lock,two threads missing the same schedule at once both compile it.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+_ENTRY = re.compile(r"^[0-9a-f]{16}$")  # the directory of a calibration
+_FILE = re.compile(r"^[0-9a-f]{16}\.npy(\.\d+\.tmp)?$")  # a schedule,or one being written
+
+
+def _digest(obj):
+    return hashlib.sha1(repr(obj).encode()).hexdigest()[:16]
+
+
+class ScheduleCache:
+    def __init__(self, capacity=64, directory=None, calibrations=4):
+        """
+        :param capacity: Schedules kept in memory
+        :param directory: Where the disk tier lives,None for memory only
+        :param calibrations: Calibrations kept on disk
+        """
+        self.capacity = capacity
+        self.directory = directory
+        self.calibrations = calibrations
+        self._memory = OrderedDict()
+        self._calibration = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, name, params: dict, compile, calibration=()):
+        """
+        Return the cached schedule of (name, params) or compile() it
+
+        :param calibration: Constants the schedule depends on besides params,e.g. (max_v, max_w, step)
+        """
+        calib = _digest(calibration)
+        key = _digest((name, sorted(params.items())))
+        with self._lock:
+            if calib != self._calibration:
+                self._invalidate(calib)
+            sch = self._memory.get(key)
+            if sch is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return sch
+            sch = self._load(key)
+            if sch is not None:
+                self.disk_hits += 1
+                self._remember(key, sch)
+                return sch
+            self.misses += 1
+
+        sch = compile()
+        with self._lock:
+            if calib == self._calibration:  # otherwise it was changed meanwhile,the schedule is of the old one
+                self._store(key, sch)
+                self._remember(key, sch)
+        return sch
+
+    def clear(self):
+        """Drop every schedule,on disk too(only the files of the cache)"""
+        with self._lock:
+            self._memory.clear()
+            for entry in self._entries():
+                self._remove(entry)
+
+    # Tiers
+# ------------------------------------------------------
+    def _remember(self, key, sch):
+        self._memory[key] = sch
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, self._calibration, key + ".npy")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            return np.load(self._path(key), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, sch):
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(sch))
+        os.replace(tmp, path)  # never leave a half-written file to be mapped
+
+    def _invalidate(self, calib):
+        """Calibration changed,the schedules in memory are of another one"""
+        self._memory.clear()
+        self._calibration = calib
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, calib)
+        if os.path.isdir(path):
+            os.utime(path)  # used,see _entries
+        # Evict the least recently used calibrations,other controllers may still use the recent ones
+        others = [e for e in self._entries() if e != calib]
+        for entry in others[:max(len(others) - (self.calibrations - 1), 0)]:
+            self._remove(entry)
+
+    def _entries(self):
+        """Directories of calibrations written by the cache,least recently used first"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        entries = [e for e in os.listdir(self.directory)
+                   if _ENTRY.match(e) and os.path.isdir(os.path.join(self.directory, e))]
+        return sorted(entries, key=lambda e: os.path.getmtime(os.path.join(self.directory, e)))
+
+    def _remove(self, entry):
+        path = os.path.join(self.directory, entry)
+        try:
+            for name in os.listdir(path):
+                if _FILE.match(name):
+                    os.remove(os.path.join(path, name))
+            os.rmdir(path)  # fails if someone else put a file in it,then it stays
+        except OSError:
+            pass
@@ -0,0 +1,237 @@
+"""
+Search the constants of DroneCore over a grid,in a pool of processes.
+
+max_v and max_w are estimates,and the circles are patched with empirical degrees(-380 and -200)
+and a vertical gain of 4. Two kinds of sweep find better values:
+
+* shapes: fly the shapes on the simulated drone with every combination of the constants,
+  score how far each ends from where it started(closure) and from its ideal route(path error)
+* logs: replay recorded flights(see replay.py) on simulated drones with every combination of
+  max_v,max_w,vertical_gain and lag,score how far their navdata is from the recorded one
+
+Flights run on a VirtualClock,so each takes milliseconds,and the combinations are spread over
+a ProcessPoolExecutor. Parameters a shape doesn't depend on aren't flown twice.
+The best combination is written as JSON,for DroneCore.load_calibration.
+
+Usage:
+    python calibrate.py shapes --sim tau=300 max_v=0.012
+    python calibrate.py logs flight1.rec flight2.rec
+    python calibrate.py shapes --grid circle_deg=-360:-420:10 --out calibration.json
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import trajectory
+from bench import path_error
+from clock import VirtualClock
+from core import DroneCore
+from sim import SimDrone
+
+GRID = {
+    "max_v": [0.008, 0.009, 0.01, 0.011, 0.012],
+    "max_w": [0.10, 0.11, 0.12, 0.13, 0.14],
+    "circle_deg": [-360, -370, -380, -390, -400],
+    "finish_deg": [-180, -190, -200, -210, -220],
+    "vertical_gain": [3, 3.5, 4, 4.5, 5],
+}
+LOG_GRID = {
+    "max_v": [0.008, 0.009, 0.01, 0.011, 0.012],
+    "max_w": [0.10, 0.11, 0.12, 0.13, 0.14],
+    "vertical_gain": [3, 3.5, 4, 4.5, 5],
+    "tau": [100, 150, 200, 300, 400],
+}
+
+# shape -> the constants it depends on
+SHAPES = {
+    "circle": ("max_v", "circle_deg"),
+    "vertical_circle": ("max_v", "circle_deg", "vertical_gain"),
+    "two_circle": ("max_v", "finish_deg"),
+    "number_eight": ("max_v", "finish_deg"),
+    "turn": ("max_w",),
+}
+TURN_WEIGHT = 0.01  # m of error per degree of heading error
+YAW_WEIGHT = 10  # mm/s of velocity error per degree of yaw error
+
+
+# Flights
+# ------------------------------------------------------
+def _schedule(shape, max_v, step, circle_deg=-360, finish_deg=-180, vertical_gain=4):
+    """The schedule of a shape,the default degrees give its ideal route"""
+    if shape == "circle":
+        return trajectory.circle(max_v=max_v, step=step, deg=circle_deg)
+    if shape == "vertical_circle":
+        return trajectory.circle(vertical=True, max_v=max_v, step=step, deg=circle_deg, vertical_gain=vertical_gain)
+    if shape == "two_circle":
+        return trajectory.two_circle(max_v=max_v, step=step, finish=finish_deg)
+    if shape == "number_eight":
+        return trajectory.number_eight(max_v=max_v, step=step, finish=finish_deg)
+    raise ValueError("unknown shape %r" % shape)
+
+
+def fly(schedule, sim_kwargs, settle=1000):
+    """Fly a schedule on a SimDrone in virtual time,return the SimDrone"""
+    clock = VirtualClock()
+    sim = SimDrone(clock=clock, **dict(sim_kwargs, takeoff_ms=0))
+    drone = DroneCore(link=sim, clock=clock)
+    drone.takeoff().result()
+    drone.play(schedule, settle).result()
+    drone.shutdown()
+    return sim
+
+
+def score_shape(task):
+    """
+    Fly one shape with the constants it depends on
+    :param task: (shape, constants, sim_kwargs)
+    :return: (closure error, path error),in m
+    """
+    shape, c, sim_kwargs = task
+    truth = dict(max_v=0.01, max_w=0.12, vertical_gain=4)
+    truth.update(sim_kwargs)
+    step = trajectory.STEP
+
+    if shape == "turn":
+        # A full turn at half speed,the heading should come back
+        w = 0.5
+        sim = fly(trajectory.line(0, 0, 0, w, 360 / (c["max_w"] * w), step), sim_kwargs)
+        return abs(sim.yaw - 360) * TURN_WEIGHT, 0.0
+
+    sim = fly(_schedule(shape, c["max_v"], step, **{n: c[n] for n in c if n != "max_v"}), sim_kwargs)
+    trace = np.array(sim.trace)[:, 1:4]
+    end = np.array(sim.position)
+    ideal = _schedule(shape, truth["max_v"], step, vertical_gain=truth["vertical_gain"])
+    ideal = trajectory.path(ideal, truth["max_v"], truth["vertical_gain"])
+    return float(np.linalg.norm(end - ideal[-1])), float(path_error(trace, ideal).mean())
+
+
+def score_log(task):
+    """
+    Replay one log on a SimDrone of the given constants
+    :param task: (log path, constants)
+    :return: velocity error in mm/s plus YAW_WEIGHT times the yaw error in degree
+    """
+    import replay
+    path, c = task
+    result = replay.replay(path, **c)
+    original = replay.recorder.load(path)
+    original = original[original["fly"] != 0]
+    n = min(len(original), len(result["replay"]))
+    yaw = np.sqrt(np.mean((original["yaw"][:n] - result["replay"]["yaw"][:n]) ** 2)) if n else 0.0
+    return result["velocity_error"] + YAW_WEIGHT * float(yaw)
+
+
+# Sweeping
+# ------------------------------------------------------
+def combinations(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def _quiet():
+    sys.stdout = open(os.devnull, "w")  # every flight prints,the workers keep silent
+
+
+def _map(func, tasks, workers):
+    with ProcessPoolExecutor(workers, initializer=_quiet) as pool:
+        return list(pool.map(func, tasks, chunksize=max(1, len(tasks) // (8 * (workers or os.cpu_count())))))
+
+
+def sweep_shapes(grid=None, shapes=None, sim_kwargs=None, workers=None):
+    """
+    Score every combination of the grid on the shapes
+    :return: List of (score, combination,{shape: (closure, path error)}),best first
+    """
+    grid = dict(GRID, **(grid or {}))
+    shapes = shapes or list(SHAPES)
+    sim_kwargs = sim_kwargs or {}
+    combos = combinations(grid)
+
+    # Fly each shape once per distinct value of the constants it depends on
+    tasks = sorted({(s, tuple((n, c[n]) for n in SHAPES[s])) for s in shapes for c in combos})
+    scores = _map(score_shape, [(s, dict(c), sim_kwargs) for s, c in tasks], workers)
+    flown = dict(zip(tasks, scores))
+
+    results = []
+    for c in combos:
+        detail = {s: flown[(s, tuple((n, c[n]) for n in SHAPES[s]))] for s in shapes}
+        results.append((sum(closure + err for closure, err in detail.values()), c, detail))
+    results.sort(key=lambda r: r[0])
+    return results, len(tasks)
+
+
+def sweep_logs(logs, grid=None, workers=None):
+    """
+    Score every combination of the grid on the recorded flights
+    :return: List of (score, combination,{log: score}),best first
+    """
+    grid = dict(LOG_GRID, **(grid or {}))
+    combos = combinations(grid)
+    tasks = [(log, c) for c in combos for log in logs]
+    scores = iter(_map(score_log, tasks, workers))
+
+    results = []
+    for c in combos:
+        detail = {log: next(scores) for log in logs}
+        results.append((float(np.mean(list(detail.values()))), c, detail))
+    results.sort(key=lambda r: r[0])
+    return results, len(tasks)
+
+
+def _values(text):
+    """'0.01,0.012' or 'start:stop:step'(stop included)"""
+    if ":" in text:
+        start, stop, step = map(float, text.split(":"))
+        step = abs(step) if stop >= start else -abs(step)
+        return [float(v) for v in np.arange(start, stop + step / 2, step)]
+    return [float(v) for v in text.split(",")]
+
+
+def _assignments(items, parse):
+    result = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        result[name] = parse(value)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("kind", choices=["shapes", "logs"])
+    parser.add_argument("logs", nargs="*", help="flight logs,for the logs sweep")
+    parser.add_argument("--grid", nargs="+", metavar="NAME=VALUES",
+                        help="values of a constant,'a,b,c' or 'start:stop:step'")
+    parser.add_argument("--sim", nargs="+", metavar="NAME=VALUE", help="the simulated drone of the shapes sweep")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="calibration.json")
+    args = parser.parse_args()
+
+    grid = _assignments(args.grid, _values)
+    start = time.monotonic()
+    if args.kind == "shapes":
+        results, flights = sweep_shapes(grid, args.shapes, _assignments(args.sim, float), args.workers)
+    else:
+        if not args.logs:
+            parser.error("the logs sweep needs flight logs")
+        results, flights = sweep_logs(args.logs, grid, args.workers)
+    elapsed = time.monotonic() - start
+
+    score, best, _ = results[0]
+    print("%d combinations,%d flights in %.1fs" % (len(results), flights, elapsed))
+    for s, c, _ in results[:5]:
+        print("%10.4f  %s" % (s, "  ".join("%s=%g" % kv for kv in sorted(c.items()))))
+    with open(args.out, "w") as f:
+        json.dump({"kind": args.kind, "best": best, "score": score,
+                   "top": [{"score": s, "constants": c, "detail": d} for s, c, d in results[:20]]}, f, indent=2)
+    print("Best constants written to %s" % args.out)
+
+
+if __name__ == '__main__':
+    main()
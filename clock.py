@@ -0,0 +1,100 @@
+"""
+Clocks and event loops the flight-control core runs on.
+
+The core never touches a GUI toolkit,it only needs
+* a clock for the control loop: now() in second and wait(cond, timeout)
+* an event loop for the sequencing: after(ms, func), run() and stop()
+
+EventLoop below runs headless in the calling thread,
+MyDrone plugs a Tk one in so that the same core drives the window.
+
+Replaying flights(see replay.py) runs the core on ScaledClock,N times faster than real time,
+or on VirtualClock,as fast as possible.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+
+class MonotonicClock:
+    """Real time"""
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, cond, timeout):
+        """Wait on a held threading.Condition for at most timeout seconds"""
+        cond.wait(timeout)
+
+
+class ScaledClock:
+    """Real time sped up 'speed' times"""
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self._origin = time.monotonic()
+
+    def now(self):
+        return self._origin + (time.monotonic() - self._origin) * self.speed
+
+    def wait(self, cond, timeout):
+        cond.wait(timeout / self.speed)
+
+
+class VirtualClock:
+    """
+    Time which only moves when it is waited for,so nothing is ever late
+    A wait of 'timeout' returns at once with the clock 'timeout' later.
+    Only one thread(the control loop) may wait on it,otherwise their waits would add up.
+    """
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self):
+        return self._now
+
+    def wait(self, cond, timeout):
+        with self._lock:
+            self._now += timeout
+        cond.wait(0)  # Still let other threads take the condition,e.g. to cancel
+
+
+class EventLoop:
+    """
+    A minimal headless event loop,callbacks are run one by one in the thread calling run()
+    after() is thread-safe so the control loop may schedule callbacks too
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
+        self._timers = []
+        self._counter = itertools.count()  # keeps the order of callbacks with the same deadline
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def after(self, ms, func):
+        with self._cond:
+            deadline = self.clock.now() + ms / 1000
+            heapq.heappush(self._timers, (deadline, next(self._counter), func))
+            self._cond.notify()
+
+    def run(self):
+        """Block until stop() is called"""
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._timers:
+                        delay = self._timers[0][0] - self.clock.now()
+                        if delay <= 0:
+                            break
+                        self.clock.wait(self._cond, delay)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, func = heapq.heappop(self._timers)
+            func()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
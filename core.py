@@ -0,0 +1,916 @@
+from math import pi
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+import itertools
+import json
+import threading
+import time
+import trajectory
+import curve
+import mission
+from scheduler import ControlLoop
+from clock import EventLoop, MonotonicClock
+from transport import ATTransport
+from cache import ScheduleCache
+from recorder import FlightRecorder
+from pid import PIDController
+from estimator import SpeedModel
+from telemetry import Telemetry
+import metrics
+from metrics import Metrics
+
+
+CALIBRATION = ("max_v", "max_w", "vertical_gain", "circle_deg", "finish_deg", "step", "adaptive", "max_step")  # of calibration()
+NAVDATA_FIELDS = ("state", "demo.vx", "demo.vy", "demo.vz", "demo.psi", "demo.altitude")  # what the core reads
+
+
+class DroneCore:
+    """
+    Extension for the default ardrone to add some characterized function
+    Focus on fly in a specific route.
+
+    This is the flight-control core without any GUI,it runs headless on its own event loop(see clock.py).
+    MyDrone puts a Tk window on top of it.
+
+    Commands go to 'link',which is a pyardrone.ARDrone by default,connected when first used.
+    Anything with the same move/hover/takeoff/land/close and state/navdata will do,e.g. sim.SimDrone
+    Unless coalesce is False,the link is wrapped in an ATTransport(see transport.py)
+    which suppresses repeated commands and packs AT commands into datagrams.
+
+    Notes:
+    * All speeds ('v' or 'w') denote the percentage of max speed,which ranges from -1 to 1
+    * All time ('period') are in millisecond
+    """
+    def __init__(self, link=None, events=None, clock=None, rate=20, adaptive=False, min_rate=5, coalesce=True,
+                 cache_dir=None):
+        """
+        :param rate: Commands sent per second,i.e. 1000/rate ms per tick
+        :param adaptive: If True,'rate' is only used where the speed changes quickly,
+                         straight segments are sent at 'min_rate'(see trajectory.adapt)
+        :param cache_dir: Where compiled shapes are kept across runs,None to keep them in memory only
+        """
+        clock = clock or MonotonicClock()
+        self.clock = clock
+        self.coalesce = coalesce
+        self._link = None  # see link
+        self._connecting = threading.Lock()
+        self.events = events or EventLoop(clock)
+
+        self.halt = False
+        self.moving = False
+        self.memo = {}  # Do nothing but memorize something
+        self._flight = 0  # counts land(),a takeoff started before the latest land() gives up
+        self._flight_lock = threading.Lock()
+        self._together = threading.local()  # see together()
+
+        # I can't find a record from the doc of ARDrone,these data are estimated
+        self.max_v = 0.01  # m/ms
+        self.max_w = 0.12  # deg/ms
+        self.vertical_gain = 4  # max_v over the max vertical speed
+        # Empirical degrees of the last arc of the circles,more than 360/180 to make up for the lag
+        self.circle_deg = -380
+        self.finish_deg = -200
+
+        # Closed-loop mode: rectify the horizontal speed of every command from navdata
+        # vz control is not included since ARDrone already has complete vz control
+        self.closed_loop = False
+        self.vx_ctrl = PIDController()
+        self.vy_ctrl = PIDController()
+        self._last_tick = None
+
+        self.recorder = None  # see record()
+        self._marked_job, self._marked_layers = None, set()  # what the recorder was told of,see _mark
+
+        # Waits for navdata,see wait_for()
+        self.navdata_changed = threading.Condition()
+        self.resend_period = 0.2  # s between two takeoff or land commands
+        self.poll_period = 0.05  # s between two checks when the link can't notify navdata
+        self.navdata_time = None  # when the latest navdata was received,if the link tells it
+        # Navdata by subscription,see subscribe()
+        self.telemetry = None
+        self.decode = True  # whether pyardrone decodes every packet in full
+        self._nav = None  # the subscription of the fields the core reads
+        self._notified = False
+        if link is not None:
+            self._connect(link)
+
+        self.metrics = Metrics()  # see metrics.py
+        self.metrics_server = None
+
+        # Online estimation of max_v,max_w and vertical_gain,see estimate()
+        self.model = None
+        self.estimate_tolerance = 0.02
+
+        self.step = 1000 / rate  # ms
+        self.adaptive = adaptive
+        self.max_step = 1000 / min_rate  # ms,only used if adaptive
+        self.cache = ScheduleCache(directory=cache_dir)
+
+        # AT commands are sent by the control loop,the event loop only submits schedules to it
+        self.loop = ControlLoop(self._send, self.step, clock)
+        self.loop.start()
+
+    def run(self):
+        """Make everything begin,block until shutdown() is called"""
+        print("Programme starts!")
+        self.events.run()
+
+    # The link to UAV
+# ------------------------------------------------------
+    @property
+    def link(self):
+        """
+        The link given to __init__,or a pyardrone.ARDrone connected on first use
+        so that planning and simulated runs never load pyardrone
+        """
+        if self._link is None:
+            with self._connecting:
+                if self._link is None:
+                    from pyardrone import ARDrone
+                    self._connect(ARDrone())
+        return self._link
+
+    def _connect(self, link):
+        self._link = ATTransport(link, clock=self.clock) if self.coalesce else link
+        self._notified = self._watch_navdata(self.clock)
+        if getattr(link, "at_client", None) is not None:
+            # A real UAV boots sending the state only,the velocities of wait_steady and the closed loop are in demo
+            from pyardrone import at
+            self._link.send(at.CONFIG("general:navdata_demo", True))
+
+    @property
+    def state(self):
+        if not self.decode and self._nav.read():
+            from pyardrone.navdata.states import DroneState
+            return DroneState(int(self._nav["state"]))
+        return self.link.state  # also until the subscription has got a packet
+
+    @property
+    def navdata(self):
+        if not self.decode and self._nav.read():
+            return self._nav.navdata
+        return self.link.navdata
+
+    def send(self, command):
+        self.link.send(command)
+
+    def move(self, **kwargs):
+        """Same as ARDrone.move,e.g. drone.move(forward=0.1)"""
+        self.link.move(**kwargs)
+
+    def hover(self):
+        self.link.hover()
+
+    def close(self):
+        if self._link is not None:  # never connected,nothing to close
+            self._link.close()
+
+    def shutdown(self):
+        """Stop the control loop and the event loop,then close the drone"""
+        self.loop.close()
+        self.stop_recording()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        self.close()
+        self.events.stop()
+        print("Programme ends!")
+
+    # Taking off and landing
+# ------------------------------------------------------
+    def takeoff(self, timeout=10, steady=True):
+        """
+        Send takeoff every resend_period until navdata says UAV flies,then wait until it hovers steadily
+        The waits are done in a thread and wake up on every navdata,so the window keeps responding
+
+        :param timeout: Seconds for each of the two waits
+        :param steady: Whether to wait for a steady hover,moves can start right after it
+        :return: A Future resolved with True when UAV hovers(or flies if not steady),False on timeout
+        """
+        flight = self._flight
+
+        def superseded():
+            return self._flight != flight  # land() was called since
+
+        def work():
+            print("Taking off...")
+            if not self.wait_for(lambda: superseded() or self.state.fly_mask,
+                                 lambda: superseded() or self.link.takeoff(), timeout):
+                print("Taking off timed out")
+                return False
+            with self._flight_lock:
+                if superseded():
+                    print("Taking off cancelled by landing")
+                    return False
+                self.halt = False
+            if steady and not self.wait_steady(timeout):
+                print("UAV is flying but not steady")
+                return False
+            if superseded():
+                return False
+            print("Done")
+            return True
+        return self._in_thread(work)
+
+    def land(self, timeout=10):
+        """
+        Stop moving at once and abort a pending takeoff,
+        then send land every resend_period until navdata says UAV is on the ground
+        :return: A Future resolved with True when UAV has landed,False on timeout
+        """
+        with self._flight_lock:
+            self._flight += 1
+            self.halt = True
+        self.moving = False
+        self.loop.cancel()
+
+        def work():
+            print("Landing...")
+            with self._batch():  # in one datagram: stop the move in effect and land
+                self.link.hover()
+                self.link.land()  # at least once,UAV may be taking off without flying yet
+            if not self.wait_for(lambda: not self.state.fly_mask, self.link.land, timeout):
+                print("Landing timed out")
+                return False
+            print("Done")
+            return True
+        return self._in_thread(work)
+
+    def _batch(self):
+        """Commands issued inside leave together(see ATTransport.batch),one by one without coalescing"""
+        batch = getattr(self.link, "batch", None)
+        return batch() if batch is not None else nullcontext()
+
+    def _in_thread(self, work):
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(work())
+            except Exception as e:
+                future.set_exception(e)
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    # Waiting for navdata
+# ------------------------------------------------------
+    def _watch_navdata(self, clock):
+        """Have every navdata packet of pyardrone notify self.navdata_changed"""
+        client = getattr(getattr(self.link, "link", self.link), "navdata_client", None)
+        if client is None:
+            return False  # e.g. SimDrone,waits poll every poll_period instead
+        received = client.navdata_received
+
+        def hook(data):
+            if self.decode:
+                received(data)
+            telemetry = self.telemetry
+            if telemetry is not None:
+                telemetry.feed(data, clock.now())
+            self.navdata_time = clock.now()
+            with self.navdata_changed:
+                self.navdata_changed.notify_all()
+        client.navdata_received = hook
+        return True
+
+    def subscribe(self, *fields, decode=None):
+        """
+        Read these navdata fields out of every packet(see telemetry.py),e.g. drone.subscribe("demo.vx", "demo.altitude")
+        The fields the core reads itself are always subscribed to
+
+        :param decode: False to stop pyardrone decoding every packet in full,
+                       state and navdata then come from the subscription of the core,
+                       or from the link until it has got a packet. None keeps it as it is
+        :return: A Subscription,its read() is lock-free and may be called on every tick
+        """
+        if not self.link or not self._notified:
+            raise ValueError("the link gives no navdata packets,e.g. SimDrone without packets=True")
+        if self.telemetry is None:
+            telemetry = Telemetry()
+            self._nav = telemetry.subscribe(*NAVDATA_FIELDS)
+            self.telemetry = telemetry
+        subscription = self.telemetry.subscribe(*fields)
+        if decode is not None:
+            self.decode = decode
+        return subscription
+
+    def wait_for(self, predicate, resend=None, timeout=10):
+        """
+        Wait until predicate() is true,it is checked on every navdata
+        :param resend: Called at once and every resend_period until then,e.g. link.takeoff
+        :return: False on timeout
+        """
+        clock = self.loop.clock
+        now = clock.now()
+        deadline = now + timeout
+        next_send = now
+        period = self.poll_period if not self._notified else self.resend_period
+        with self.navdata_changed:
+            while True:
+                try:
+                    if predicate():
+                        return True
+                except AttributeError:
+                    pass  # No navdata received yet
+                now = clock.now()
+                if now >= deadline:
+                    return False
+                if resend is not None and now >= next_send:
+                    resend()
+                    next_send = now + self.resend_period
+                wake = min(deadline, now + period, next_send if resend is not None else deadline)
+                clock.wait(self.navdata_changed, max(wake - now, 0))
+
+    def wait_steady(self, timeout=10, hold=0.5, speed=100):
+        """
+        Wait until UAV has hovered steadily for 'hold' seconds,i.e. no axis of navdata faster than 'speed' mm/s
+        Without the demo block of navdata(navdata_demo off) it only waits for 'hold' seconds of flying
+        :return: False on timeout
+        """
+        clock = self.loop.clock
+        since = None
+
+        def steady():
+            nonlocal since
+            try:
+                demo = self.navdata.demo
+                moving = max(abs(demo.vx), abs(demo.vy), abs(demo.vz)) > speed
+            except AttributeError:
+                moving = not self.state.fly_mask
+            now = clock.now()
+            if moving:
+                since = None
+                return False
+            if since is None:
+                since = now
+            return now - since >= hold
+        return self.wait_for(steady, timeout=timeout)
+
+    # Basic moving
+# ------------------------------------------------------
+    def _send(self, row):
+        """Called by the control loop at the deadline of every row"""
+        t, vx, vy, vz, w = row
+        sent_vx, sent_vy = vx, vy
+        if not (vx or vy or vz or w):
+            self.link.hover()  # Let ARDrone hold its position itself
+            if self.closed_loop:
+                self.clear_controller()  # Don't carry the error of one segment into the next one
+        else:
+            if self.closed_loop:
+                sent_vx, sent_vy = self.speed_offset(t, vx, vy)
+            self.link.move(forward=sent_vy, right=sent_vx, up=vz, cw=w)
+
+        loop = self.loop
+        age = None if self.navdata_time is None else (loop.tick_time - self.navdata_time) * 1000
+        self.metrics.tick(loop.job.label, loop.tick_time, loop.tick_lateness, self.step, age)
+
+        recorder, model = self.recorder, self.model
+        if recorder is None and model is None:
+            return
+        try:
+            navdata = self.navdata
+        except AttributeError:
+            navdata = None  # No navdata received yet
+        if recorder is not None:
+            self._mark(recorder, loop)
+            try:
+                fly = self.state.fly_mask
+            except AttributeError:
+                fly = False  # unknown before navdata
+            recorder.record(self.loop.tick_time, vx, vy, vz, w, self.loop.tick_lateness, navdata, fly,
+                            sent_vx=sent_vx, sent_vy=sent_vy)
+        if model is not None and navdata is not None:
+            model.update(self.loop.tick_time, (sent_vx, sent_vy, vz, w), navdata)
+
+    def _mark(self, recorder, loop):
+        """Tell the recorder which move the coming record belongs to,and the layers laid over it,as they start"""
+        job = loop.job
+        if job is not self._marked_job:
+            self._marked_job = job
+            recorder.mark(recorder.count, label=job.label, params=job.params, start=loop.job_start)
+        layers = loop.layers
+        if layers or self._marked_layers:
+            for layer in layers:
+                if layer not in self._marked_layers:
+                    recorder.mark(recorder.count, label=layer.label, params=layer.params, start=layer.start,
+                                  ms=layer.length, layer=True)
+            self._marked_layers = set(layers)
+
+    def record(self, path):
+        """
+        Record every tick into a binary flight log(see recorder.py) until stop_recording()
+        The moves the ticks belong to and the calibration go into a sidecar file,see recorder.load_moves
+        """
+        self.stop_recording()
+        self._marked_job, self._marked_layers = None, set()
+        self.recorder = FlightRecorder(path, meta=dict(zip(CALIBRATION, self.calibration())))
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+
+    def estimate(self, enable=True):
+        """
+        Refine max_v,max_w and vertical_gain from navdata while flying(see estimator.py)
+        The estimates are taken between moves,when they differ by more than estimate_tolerance,
+        so the next arc_move is timed on the current battery and payload
+        """
+        self.model = SpeedModel(self.max_v, self.max_w, self.vertical_gain) if enable else None
+
+    def refine(self):
+        """Take the estimates of the speed model,called when a move is done"""
+        model = self.model
+        if model is None:
+            return
+        for name, value in (("max_v", model.max_v), ("max_w", model.max_w),
+                            ("vertical_gain", model.vertical_gain(model.max_v or self.max_v))):
+            old = getattr(self, name)
+            if value is not None and abs(value - old) > self.estimate_tolerance * old:
+                print("%s is estimated at %.4g instead of %.4g" % (name, value, old))
+                setattr(self, name, value)
+
+    def measured_velocity(self):
+        """The speed reported by navdata,(right, forward) in percentage of max_v"""
+        demo = self.navdata.demo
+        k = 1e-6 / self.max_v  # mm/s -> m/ms -> percentage
+        return demo.vy * k, demo.vx * k
+
+    def clear_controller(self):
+        self.vx_ctrl.clear()
+        self.vy_ctrl.clear()
+        self._last_tick = None
+
+    def speed_offset(self, t, vx, vy):
+        """
+        Call the PID controllers with the newest navdata to rectify the speed of one command
+        Every schedule starts at t=0,the controllers are cleared there
+        Without navdata(none received yet,or navdata_demo off) the command is sent open-loop
+        """
+        try:
+            real_vx, real_vy = self.measured_velocity()
+        except AttributeError:
+            self.clear_controller()  # start afresh once navdata comes
+            return vx, vy
+        now = self.loop.clock.now()
+        if t == 0 or self._last_tick is None:
+            self.clear_controller()
+            dt = 0.0
+        else:
+            dt = now - self._last_tick
+        self._last_tick = now
+
+        vx += self.vx_ctrl.delta(vx - real_vx, dt)
+        vy += self.vy_ctrl.delta(vy - real_vy, dt)
+        return min(max(vx, -1.0), 1.0), min(max(vy, -1.0), 1.0)
+
+    def finish(self, schedule, settle=0):
+        """The last step of compiling: append the settle hovering and adapt the rate"""
+        if settle:
+            schedule = trajectory.chain([schedule, trajectory.hover(settle, self.step)], step=self.step)
+        if self.adaptive:
+            schedule = trajectory.adapt(schedule, self.max_step)
+        return schedule
+
+    def play(self, schedule, settle=0, label="play", params=None):
+        """
+        Submit a compiled schedule(see trajectory.py) to the control loop,which sends one row every tick
+        Nothing is computed when flying,the row is sent as it is
+
+        :param schedule: Array of rows (t, vx, vy, vz, w)
+        :param settle: Milliseconds of hovering after the last command to make the UAV stable,
+                       the move is done only after that
+        :param label: What the move is,the metrics of its ticks are counted under it
+        :param params: The arguments the method 'label' compiles this schedule from,for the flight log,
+                       so that replay.py can compile it again. None if it can't
+        :return: A Future resolved with True when the move is done,False if it is cancelled
+        """
+        return self._submit(self.finish(schedule, settle), label, params)
+
+    def play_cached(self, name, params: dict, compile, settle=0):
+        """
+        Same as play(compile(),settle),but the schedule is looked up in self.cache first(see cache.py)
+        'name' and 'params' must identify the schedule compile() returns,
+        name is the method of DroneCore which compiles it from params,e.g. "circle"
+        """
+        schedule = self.cache.get(name, dict(params, settle=settle),
+                                  lambda: self.finish(compile(), settle), self.calibration())
+        return self._submit(schedule, name, params)
+
+    def play_stream(self, schedules, lookahead=2, label="stream"):
+        """
+        Play schedules one after another,each starts one step after the previous one(see ControlLoop)
+        They are pulled from the iterable by a thread of their own,at most 'lookahead' ahead of the one flying,
+        so a long stream is never materialised and compiling never delays the control loop
+
+        :return: A Future resolved with True when all are done,False if cancelled,
+                 or the exception the iterable raised
+        """
+        future = Future()
+        if self.halt:
+            future.set_result(False)
+            return future
+        self.moving = True
+        slots = threading.Semaphore(lookahead)
+        lock = threading.Lock()
+        progress = {"pending": 0, "fed": False, "ok": True, "error": None}
+
+        def end():
+            self.moving = self.loop.busy
+            self.refine()
+            print("Done")
+            if future.cancelled():
+                return
+            if progress["error"] is not None:
+                future.set_exception(progress["error"])
+            else:
+                future.set_result(progress["ok"])
+
+        def done(finished):
+            with lock:
+                progress["pending"] -= 1
+                progress["ok"] = progress["ok"] and finished
+                last = progress["fed"] and not progress["pending"]
+            slots.release()
+            if last:
+                end()
+
+        def feed():
+            try:
+                for schedule in schedules:
+                    slots.acquire()
+                    if not progress["ok"] or self.halt:
+                        progress["ok"] = False
+                        break
+                    with lock:
+                        progress["pending"] += 1
+                    self.loop.submit(self.finish(schedule, 0), done, label)
+            except Exception as e:
+                progress["error"] = e
+            finally:
+                close = getattr(schedules, "close", None)
+                if close:
+                    close()
+            with lock:
+                progress["fed"] = True
+                last = not progress["pending"]
+            if last:
+                end()
+
+        threading.Thread(target=feed, daemon=True).start()
+        return future
+
+    def run_mission(self, source, lookahead=2):
+        """
+        Fly a mission file(see mission.py),segments are read and compiled while flying
+
+        :param source: The path of the file,or any iterable of its lines
+        :return: A Future like play_stream
+        """
+        if isinstance(source, str):
+            header, segments = mission.open_mission(source)
+        else:
+            header, segments = mission.read(source)
+        print("Mission %s starts" % header["mission"])
+        schedules = mission.schedules(header, segments, self.max_v, self.step, self.vertical_gain)
+        return self.play_stream(schedules, lookahead, "mission")
+
+    def calibration(self):
+        """Constants a compiled schedule depends on besides its own parameters,named in CALIBRATION"""
+        return (self.max_v, self.max_w, self.vertical_gain, self.circle_deg, self.finish_deg,
+                self.step, self.adaptive, self.max_step)
+
+    def serve_metrics(self, port=8765, host="127.0.0.1"):
+        """Serve metrics_snapshot() over HTTP on /metrics(text) and /metrics.json"""
+        if self.metrics_server is None:
+            self.metrics_server = metrics.serve(self.metrics_snapshot, host, port)
+            print("Metrics on http://%s:%d/metrics" % (host, port))
+        return self.metrics_server
+
+    def metrics_snapshot(self):
+        """The metrics of the moves,plus the totals of the control loop and of the transport"""
+        snapshot = self.metrics.snapshot()
+        loop = self.loop.stats()
+        snapshot["counters"].update(ticks=loop["ticks"], skipped=loop["skipped"])
+        if hasattr(self._link, "stats"):
+            for name, value in self._link.stats().items():
+                snapshot["counters"]["transport." + name] = value
+        return snapshot
+
+    def load_calibration(self, path):
+        """Take the constants found by calibrate.py,cached schedules are recompiled with them"""
+        with open(path) as f:
+            best = json.load(f)["best"]
+        for name in ("max_v", "max_w", "vertical_gain", "circle_deg", "finish_deg"):
+            if name in best:
+                setattr(self, name, best[name])
+
+    def _submit(self, schedule, label=None, params=None):
+        future = Future()
+        if self.halt:
+            future.set_result(False)
+            return future
+        self.moving = True
+        layered = getattr(self._together, "on", False)
+        if not layered:
+            self.memo = {"schedule": schedule}
+
+        def done(finished):
+            self.moving = self.loop.busy
+            if not layered:
+                self.memo = {}
+            self.refine()
+            print("Done")
+            if not future.done():
+                future.set_result(finished)
+
+        if layered:
+            self.loop.overlay(schedule, done, label, params)
+        else:
+            self.loop.submit(schedule, done, label, params)
+        return future
+
+    @contextmanager
+    def together(self):
+        """
+        Moves started in the block are laid over whatever is flying instead of being queued(see ControlLoop.overlay)
+        Each keeps its own schedule and Future,every tick sends their sum clamped to [-1, 1] as one command
+        e.g. yaw while drawing a circle,or a helix:
+            with drone.together():
+                drone.circle()
+                drone.climb(0.2, 7000)
+        Only moves started in the calling thread are affected
+        """
+        self._together.on = True
+        try:
+            yield
+        finally:
+            self._together.on = False
+
+    def free_move(self, vx, vy, vz, w, ms_period):
+        """The base moving method of my drone"""
+        return self.play(trajectory.line(vx, vy, vz, w, ms_period, self.step), label="free_move",
+                         params=dict(vx=vx, vy=vy, vz=vz, w=w, ms_period=ms_period))
+
+    def settle(self, ms_period=1500):
+        """
+        Hover for a while to make the UAV stable
+        It is a timed step in the control loop rather than a sleep,so the window keeps responding
+        and land() stops it at once
+        """
+        return self.play(trajectory.hover(ms_period, self.step), label="settle", params=dict(ms_period=ms_period))
+
+    def turn(self, w, ms_period=1000):
+        """
+        Turning clockwise if v > 0,counterclockwise if v < 0
+        """
+        assert(-1 <= w <= 1)
+        return self.free_move(0, 0, 0, w, ms_period)
+
+    def right(self, v, ms_period=1000):
+        """Moving right if v >0,left if v < 0"""
+        assert(-1 <= v <= 1)
+        return self.free_move(v, 0, 0, 0, ms_period)
+
+    def forward(self, v=0.1, ms_period=1000):
+        """Moving forward if v >0,backward if v < 0"""
+        assert(-1 <= v <= 1)
+        return self.free_move(0, v, 0, 0, ms_period)
+
+    def climb(self, v, ms_period=1000):
+        """Moving up if v >0,down if v < 0"""
+        assert(-1 <= v <= 1)
+        return self.free_move(0, 0, v, 0, ms_period)
+
+    def move_seq(self, seq: list, interval=200, index=0, no_pause=False, blend=0):
+        """
+        Handle a sequence of moves,one after another
+        Each item is a compiled schedule,or a function starting a move and returning its Future,
+        e.g. lambda: self.turn(0.5)
+        The completion of a move starts the next one in the control loop,right after its last row,
+        so it begins on the very next tick. Functions are called in the thread of the control loop then,
+        they should submit a move and return,never wait for one.
+        A function returning no Future is waited for the old way: self.moving is checked every 'interval' ms.
+
+        :param seq: The list of schedules or functions
+        :param interval: The interval between two checks of self.moving
+        :param index: Where to start in seq
+        :param no_pause: Whether there is no pause between two moves
+        :param blend: Milliseconds around the join of two schedules where the speed fades from one into the other,
+                      only without pause(see trajectory.chain)
+        :return: A Future resolved with True when all moves are done,False if one is cancelled,
+                 it gets the exception of an item which raises
+        """
+        items = seq[index:]
+        if no_pause and blend:
+            # Schedules next to each other are blended into one
+            items = []
+            for is_func, group in itertools.groupby(seq[index:], callable):
+                group = list(group)
+                items += group if is_func or len(group) == 1 else \
+                    [trajectory.chain(group, step=self.step, blend=blend)]
+        future = Future()
+
+        def end(finished):
+            if not future.done():
+                future.set_result(finished)
+
+        def start(i):
+            if self.halt:
+                end(False)  # Landing,drop the rest of the sequence
+                return
+            if i == len(items):
+                end(True)
+                return
+            self.metrics.count("move_seq.steps")
+            if not no_pause:
+                self.settle(1500)  # this is a pause make the UAV stable before next move
+            item = items[i]
+            try:
+                started = item() if callable(item) else self.play(item, label="move_seq")
+            except Exception as e:
+                # Likely in a done callback of the previous move,where nobody would see it
+                if not future.done():
+                    future.set_exception(e)
+                return
+            if isinstance(started, Future):
+                started.add_done_callback(lambda f: next_or_end(f, i))
+            else:
+                self.events.after(interval, lambda: poll(i))
+
+        def next_or_end(f, i):
+            if f.cancelled() or f.exception() is not None or not f.result():
+                end(False)
+            else:
+                start(i + 1)
+
+        def poll(i):
+            if self.moving:
+                self.metrics.count("move_seq.polls")
+                self.events.after(interval, lambda: poll(i))
+            else:
+                start(i + 1)
+
+        start(0)
+        return future
+
+    def arc_move(self, v, r, deg, start_angle=0, vertical=False):
+        """
+        A much more user-friendly arc_move
+
+        If vertical, it flies in x-z plane,otherwise in x-y plane
+        UAV is supposed at the place of 6 o'clock at default
+        i.e.
+        6 o'clock -> 0 degree
+        3 o'clock -> 90 degree or -270
+        9 o'clock -> -90 degree or 270
+        12 o'clock -> 180 degree
+        The sign of deg stands for counterclockwise(+)/clockwise(-) move
+
+        Examples:
+        To move UAV from 6 o'clock to 3 o'clock counterclockwise with 10% speed,1m radius
+        drone.arc_move(0.1, 1, 90, 0)
+
+        To move UAV from 6 o'clock to 9 o'clock clockwise with 10% speed,1m radius
+        drone.arc_move(0.1, 1, -90, 0)
+
+        To move UAV from 6 o'clock to 9 o'clock counterclockwise with 10% speed,1m radius
+        drone.arc_move(0.1, 1, 270, 0)
+
+        To move UAV from 9 o'clock to 6 o'clock counterclockwise with 10% speed,1m radius
+        drone.arc_move(0.1, 1, 90, -90)
+
+        To move UAV from 8 o'clock to 5 o'clock counterclockwise with 10% speed,1m radius
+        drone.arc_move(0.1, 1, 90, -60)
+
+        To move 2 rounds
+        drone.arc_move(0.1, 1, 720, 0)
+        """
+        rad = pi * deg/180
+        start_rad = pi * start_angle/180
+        ms_period = abs(r * rad / (v * self.max_v))
+        print("Circle starts")
+        print("Will take %.3fms" % ms_period)
+        return self.play_cached("arc_move", dict(v=v, r=r, deg=deg, start_angle=start_angle, vertical=vertical),
+                                lambda: trajectory.arc(v, rad, ms_period, start_rad, vertical, self.step,
+                                                       self.vertical_gain), 1000)
+
+    def function_move(self, f_vx, f_vy, f_vz, ms_period):
+        """
+        This function largely resembles the basic free_move
+        But it takes three function instead of three velocity!
+        Functions should be in the unit of (v_percentage)/s
+        They are evaluated over the whole period before the move starts,
+        numpy-friendly functions are evaluated at once,others point by point
+        Use record() rather than printing to see what is sent
+        Low accuracy!
+        """
+        start = time.perf_counter()
+        schedule = trajectory.function(f_vx, f_vy, f_vz, ms_period, self.step)
+        self.metrics.callback.observe((time.perf_counter() - start) * 1000)
+        return self.play(schedule, settle=1500, label="function_move")
+
+    def curve_move(self, x, y, z, ms_period, v=1.0):
+        """
+        x,y,z are three parameter functions of time(in second)
+        so that at time t,UAV will be at the coordinate (x,y,z) relative to where it starts
+        Where the functions ask for more than speed percentage v,the move is slowed down and lasts longer
+        See curve.curve
+        """
+        start = time.perf_counter()
+        schedule = curve.curve(x, y, z, ms_period, v, max_v=self.max_v,
+                               vertical_gain=self.vertical_gain, step=self.step)
+        self.metrics.callback.observe((time.perf_counter() - start) * 1000)
+        return self.play(schedule, settle=1500, label="curve_move")
+
+    def waypoint_move(self, points, v=0.2, accel=1.0):
+        """
+        Fly a smooth route through points (x, y, z) in meter relative to where UAV is,
+        starting and ending at rest,e.g.
+            drone.waypoint_move([(0, 1, 0), (1, 1, 0.5), (1, 0, 0)])
+
+        :param v: The highest speed percentage of any axis
+        :param accel: The highest acceleration in m/s^2,lower for smoother turns
+        """
+        points = [tuple(map(float, p)) for p in points]
+        return self.play_cached("waypoint_move", dict(points=points, v=v, accel=accel),
+                                lambda: curve.waypoints([(0.0, 0.0, 0.0)] + points, v, accel, self.max_v,
+                                                        self.vertical_gain, step=self.step), 1500)
+
+    # Shape moving
+# ------------------------------------------------------
+    def square(self, v=0.2, ms_period=600):
+        """
+        Moving in the route of a square in horizontal plane in the order of forward,right,backward,left
+
+        :param v: speed percentage
+        :param ms_period: time to cover one side
+        """
+        print("Square moving start")
+        return self.play_cached("square", dict(v=v, ms_period=ms_period),
+                                lambda: trajectory.square(v, ms_period, step=self.step))
+
+    def triangle(self, v=0.2, ms_period=800):
+        """
+        Moving in the route of a triangle in horizontal plane in the order of forward,backward,left
+
+        :param v: Speed percentage
+        :param ms_period: Time to cover one side
+        """
+        print("Triangle moving start")
+        return self.play_cached("triangle", dict(v=v, ms_period=ms_period),
+                                lambda: trajectory.triangle(v, ms_period, step=self.step))
+
+    def circle(self, v=0.1, r=0.6, vertical=False):
+        """
+        Draw a circle clockwise.
+        For mysterious reason,the trace is not circle enough.
+        """
+        print("Circle moving starts")
+        return self.play_cached("circle", dict(v=v, r=r, vertical=vertical),
+                                lambda: trajectory.circle(v, r, vertical, self.max_v, self.step,
+                                                          self.circle_deg, self.vertical_gain), 1000)
+
+    def two_circle(self, v=0.1, r=0.6, vertical=False, pause=1000, blend=0):
+        """
+        This function split circle move into two half-circle move
+        which improve the stability.
+
+        :param pause: ms of hovering between the halves,0 to fly them as one circle
+        :param blend: ms over which the speed fades across the join when there is no pause
+        """
+        print("Circle moving starts")
+        return self.play_cached("two_circle", dict(v=v, r=r, vertical=vertical, pause=pause, blend=blend),
+                                lambda: trajectory.two_circle(v, r, vertical, self.max_v, pause, self.step,
+                                                              self.finish_deg, self.vertical_gain, blend), 1000)
+
+    def number_eight(self, pause=1000, blend=0):
+        """Four half circles,'pause' and 'blend' as in two_circle"""
+        return self.play_cached("number_eight", dict(pause=pause, blend=blend),
+                                lambda: trajectory.number_eight(0.1, 0.6, self.max_v, pause, self.step,
+                                                                self.finish_deg, blend), 1000)
+
+    def helix(self, v=0.1, r=0.6, up=0.2, turns=1):
+        """
+        Circles clockwise while climbing,an arc_move with a climb laid over it
+        :param up: Climbing speed percentage,negative to go down
+        :return: The Future of the arc
+        """
+        ms_period = abs(r * 2 * pi * turns / (v * self.max_v))
+        with self.together():
+            arc = self.arc_move(v, r, -360 * turns)
+            self.climb(up, ms_period)
+        return arc
+
+    def spiral_up(self):
+        return self.play_cached("spiral_up", {},
+                                lambda: trajectory.spiral_up(0.1, 0.7, self.max_v, self.step), 1500)
+
+    def star(self):
+        return self.play_cached("star", {},
+                                lambda: trajectory.star(0.1, 1200, step=self.step))
+
+    def four_leaves(self):
+        return self.play_cached("four_leaves", {},
+                                lambda: trajectory.four_leaves(0.1, 0.8, self.max_v, step=self.step), 1000)
+
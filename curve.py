@@ -0,0 +1,167 @@
+"""
+Fly routes given by position rather than by speed,what junk.curve_move was meant to do.
+
+A route is either
+* waypoints: 3-D points joined by a Catmull-Rom spline,which passes through every point
+* parametric: functions x(t), y(t), z(t) of the time in second
+
+The route is sampled densely,then timed under a speed limit(per axis,as commands are)
+and an acceleration limit(along and across the route),and finally differentiated at the ticks
+of the control loop into a schedule of free_move speeds(see trajectory.py).
+Everything is done on whole arrays before the flight,so a long route costs nothing per tick.
+
+Positions are in meter,x points right,y forward and z up,as in trajectory.path.
+"""
+import numpy as np
+
+import trajectory
+from trajectory import T, VX, VZ, STEP
+
+
+# Sampling
+# ------------------------------------------------------
+def catmull_rom(points, resolution=0.01):
+    """
+    Sample the Catmull-Rom spline through points about every 'resolution' meter
+
+    :param points: Sequence of (x, y, z)
+    :return: Array of rows (x, y, z),the first and last rows are the first and last points
+    """
+    p = np.asarray(points, dtype=float)
+    if p.ndim != 2 or p.shape[1] != 3 or len(p) < 2:
+        raise ValueError("at least two points (x, y, z) are needed")
+    ext = np.concatenate([p[:1], p, p[-1:]])  # the end points are repeated as their own neighbours
+    p0, p1, p2, p3 = ext[:-3], ext[1:-2], ext[2:-1], ext[3:]
+
+    counts = np.maximum(np.ceil(np.linalg.norm(p2 - p1, axis=1) / resolution), 1).astype(int)
+    seg = np.repeat(np.arange(len(counts)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    u = ((np.arange(counts.sum()) - first) / counts[seg])[:, None]
+
+    p0, p1, p2, p3 = p0[seg], p1[seg], p2[seg], p3[seg]
+    pos = 0.5 * (2 * p1 + (p2 - p0) * u + (2 * p0 - 5 * p1 + 4 * p2 - p3) * u ** 2
+                 + (3 * p1 - p0 - 3 * p2 + p3) * u ** 3)
+    return np.concatenate([pos, p[-1:]])
+
+
+def parametric(fx, fy, fz, ms_period, fine=5):
+    """
+    Sample x(t), y(t), z(t) every 'fine' ms,t is in second as in function_move
+    Like function_move,numpy-friendly functions are evaluated at once,others point by point
+
+    :return: (times in ms, positions)
+    """
+    t = np.append(np.arange(0, ms_period, fine, dtype=float), float(ms_period))
+    sec = t / 1000
+    pos = np.stack([trajectory._sample(f, sec) for f in (fx, fy, fz)], axis=1)
+    return t, pos
+
+
+# Timing
+# ------------------------------------------------------
+def _axis_cap(tangent, v, max_v, vertical_gain):
+    """Highest speed(m/ms) along each tangent which keeps every axis command within v"""
+    worst = np.maximum(np.abs(tangent[:, :2]).max(axis=1), vertical_gain * np.abs(tangent[:, 2]))
+    return v * max_v / np.maximum(worst, 1e-12)
+
+
+def retime(pos, cap, accel=None, rest=True):
+    """
+    The fastest timing of a route under speed caps and an acceleration limit
+
+    :param pos: Array of rows (x, y, z),consecutive rows must differ
+    :param cap: Speed cap of every row,in m/ms
+    :param accel: m/s^2 along and across the route,None for no limit
+    :param rest: Whether it starts and ends at rest
+    :return: The time of every row,in ms
+    """
+    delta = np.diff(pos, axis=0)
+    ds = np.linalg.norm(delta, axis=1)
+    cap = np.array(cap, dtype=float)
+    if accel:
+        a = accel / 1e6  # m/s^2 -> m/ms^2
+        # Lateral: v^2 * curvature <= a,the curvature is the turn between two steps over their length
+        tangent = delta / ds[:, None]
+        cos_turn = np.clip((tangent[:-1] * tangent[1:]).sum(axis=1), -1, 1)
+        curvature = np.arccos(cos_turn) / ((ds[:-1] + ds[1:]) / 2)
+        with np.errstate(divide="ignore"):
+            cap[1:-1] = np.minimum(cap[1:-1], np.sqrt(a / curvature))
+        if rest:
+            cap[[0, -1]] = 0.0
+
+        # Along: v_i^2 <= v_k^2 + 2a|s_i - s_k| for every k,i.e. a running minimum both ways
+        s = np.concatenate([[0.0], np.cumsum(ds)])
+        v2 = cap ** 2
+        forward = 2 * a * s + np.minimum.accumulate(v2 - 2 * a * s)
+        backward = -2 * a * s + np.minimum.accumulate((v2 + 2 * a * s)[::-1])[::-1]
+        v = np.sqrt(np.maximum(np.minimum(v2, np.minimum(forward, backward)), 0))
+    else:
+        v = cap
+    dt = 2 * ds / np.maximum(v[:-1] + v[1:], 1e-12)
+    return np.concatenate([[0.0], np.cumsum(dt)])
+
+
+def _distinct(pos, *others):
+    """Drop the rows equal to the previous one,so that every step has a direction"""
+    keep = np.ones(len(pos), dtype=bool)
+    keep[1:] = np.linalg.norm(np.diff(pos, axis=0), axis=1) > 1e-9
+    return (pos[keep],) + tuple(o[keep] for o in others)
+
+
+def schedule(times, pos, max_v=0.01, vertical_gain=4, step=STEP):
+    """
+    Differentiate a timed route at the ticks of the control loop
+    Each row is the speed which takes UAV from its position at the tick to the one at the next tick,
+    so trajectory.path of the schedule runs through the route. The last row hovers.
+    """
+    t = trajectory.ticks(times[-1], step)
+    if t[-1] < times[-1]:
+        t = np.append(t, times[-1])
+    at = np.stack([np.interp(t, times, pos[:, i]) for i in range(3)], axis=1)
+
+    sch = np.zeros((len(t), 5))
+    sch[:, T] = t
+    if len(t) > 1:
+        speed = np.diff(at, axis=0) / (np.diff(t)[:, None] * max_v)
+        speed[:, 2] *= vertical_gain
+        sch[:-1, VX:VZ + 1] = speed
+    return sch
+
+
+# Routes
+# ------------------------------------------------------
+def waypoints(points, v=0.2, accel=1.0, max_v=0.01, vertical_gain=4, step=STEP, resolution=0.01):
+    """
+    The schedule through waypoints,starting and ending at rest
+
+    :param points: Sequence of (x, y, z) in meter,UAV is at the first one
+    :param v: The highest speed percentage of any axis
+    :param accel: The highest acceleration in m/s^2
+    """
+    pos, = _distinct(catmull_rom(points, resolution))
+    if len(pos) < 2:
+        return trajectory.hover(0, step)
+    tangent = np.diff(pos, axis=0)
+    tangent /= np.linalg.norm(tangent, axis=1)[:, None]
+    seg_cap = _axis_cap(tangent, v, max_v, vertical_gain)
+    cap = np.concatenate([seg_cap[:1], np.minimum(seg_cap[:-1], seg_cap[1:]), seg_cap[-1:]])
+    times = retime(pos, cap, accel)
+    return schedule(times, pos, max_v, vertical_gain, step)
+
+
+def curve(fx, fy, fz, ms_period, v=1.0, accel=None, max_v=0.01, vertical_gain=4, step=STEP):
+    """
+    The schedule following x(t), y(t), z(t) for t in [0, ms_period/1000] second
+    It keeps the timing of the functions,except where it is slowed down to respect v and accel,
+    in which case the move lasts longer than ms_period
+    """
+    t, pos = parametric(fx, fy, fz, ms_period)
+    pos, t = _distinct(pos - pos[0], t)
+    if len(pos) < 2:
+        return trajectory.hover(ms_period, step)
+    delta = np.diff(pos, axis=0)
+    ds = np.linalg.norm(delta, axis=1)
+    seg_cap = np.minimum(ds / np.diff(t), _axis_cap(delta / ds[:, None], v, max_v, vertical_gain))
+    cap = np.concatenate([seg_cap[:1], np.minimum(seg_cap[:-1], seg_cap[1:]), seg_cap[-1:]])
+    times = retime(pos, cap, accel, rest=False)
+    return schedule(times, pos, max_v, vertical_gain, step)
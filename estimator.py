@@ -0,0 +1,101 @@
+"""
+Online estimation of the speed model of UAV(max_v,max_w and the vertical gain) from navdata.
+
+The velocity UAV reaches is proportional to the command,once it had time to speed up:
+    measured = gain * command
+so each axis fits its gain by recursive least squares over the ticks whose command has been steady
+for a while. A forgetting factor lets the gains follow the battery and the payload.
+"""
+
+
+class RLS:
+    """
+    Scalar recursive least squares of y = gain * x,with forgetting
+
+    No sample is kept,only p,how uncertain the gain is. Forgetting keeps p from shrinking to 0,
+    so a gain fitted for minutes still moves when the battery runs down
+    """
+    __slots__ = ("gain", "p", "forgetting", "samples")
+
+    def __init__(self, gain=1.0, p=100.0, forgetting=0.995):
+        """
+        :param gain: The first guess
+        :param p: How little the first guess is trusted,relative to the noise of y
+        """
+        self.gain = gain
+        self.p = p
+        self.forgetting = forgetting
+        self.samples = 0
+
+    def update(self, x, y):
+        px = self.p * x
+        k = px / (self.forgetting + x * px)
+        self.gain += k * (y - self.gain * x)
+        self.p = (self.p - k * px) / self.forgetting
+        self.samples += 1
+
+
+class SpeedModel:
+    """
+    Gains of the four axes(right, forward, up, clockwise) in m/ms or deg/ms at a command of 1
+    Each axis estimates the ratio of its gain to the first guess,so that all are fitted on the same scale
+
+    :param steady: Seconds a command must be held before its ticks are used,
+                   UAV is still speeding up before that
+    :param threshold: Smaller commands tell nothing about the gain and are not used
+    """
+    AXES = ("right", "forward", "up", "cw")
+
+    def __init__(self, max_v=0.01, max_w=0.12, vertical_gain=4, forgetting=0.995,
+                 steady=0.6, threshold=0.05, min_samples=20):
+        self.guesses = (max_v, max_v, max_v / vertical_gain, max_w)
+        self.axes = [RLS(forgetting=forgetting) for _ in self.guesses]
+        self.steady = steady
+        self.threshold = threshold
+        self.min_samples = min_samples
+
+        self._command = [0.0] * 4
+        self._since = [0.0] * 4
+        self._yaw = None  # (time, yaw in deg) of the previous tick
+
+    def update(self, now, command, navdata):
+        """
+        Called every tick with the command sent and the latest navdata
+        :param now: Second
+        :param command: (right, forward, up, cw) in percentage
+        """
+        demo = navdata.demo
+        yaw = demo.psi / 1000
+        rate = None
+        if self._yaw is not None and now > self._yaw[0]:
+            turned = (yaw - self._yaw[1] + 180) % 360 - 180  # psi wraps at +-180
+            rate = turned / ((now - self._yaw[0]) * 1000)
+        self._yaw = (now, yaw)
+        measured = (demo.vy * 1e-6, demo.vx * 1e-6, demo.vz * 1e-6, rate)  # mm/s -> m/ms
+
+        for i, x in enumerate(command):
+            if x != self._command[i]:
+                self._command[i] = x
+                self._since[i] = now
+            elif abs(x) >= self.threshold and now - self._since[i] >= self.steady and measured[i] is not None:
+                self.axes[i].update(x, measured[i] / self.guesses[i])
+
+    def ready(self, axis):
+        return self.axes[axis].samples >= self.min_samples
+
+    def gain(self, axis):
+        return self.axes[axis].gain * self.guesses[axis]
+
+    @property
+    def max_v(self):
+        """Mean gain of the horizontal axes which have been estimated,None if neither"""
+        gains = [self.gain(i) for i in (0, 1) if self.ready(i)]
+        return sum(gains) / len(gains) if gains else None
+
+    @property
+    def max_w(self):
+        return self.gain(3) if self.ready(3) else None
+
+    def vertical_gain(self, max_v):
+        """max_v over the vertical gain,None if not estimated"""
+        return max_v / self.gain(2) if self.ready(2) and self.axes[2].gain > 0 else None
@@ -0,0 +1,200 @@
+"""
+Fly several drones from one process on one control loop.
+
+A fleet schedule is the schedules of all the drones merged on the same ticks:
+one row (t, vx0, vy0, vz0, w0, vx1, vy1, ...) per tick,so a single ControlLoop(see scheduler.py)
+sends every drone its command at the same deadline and formations stay synchronised.
+Each tick every drone gets its command through the ATTransport of its DroneCore,
+which drops the ones that didn't change until their keepalive is due.
+
+    fleet = Fleet.simulated(4)
+    fleet.takeoff().result()
+    fleet.formation("circle", delays=[0, 500, 1000, 1500]).result()
+    fleet.land().result()
+"""
+import inspect
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+import trajectory
+from clock import MonotonicClock
+from core import DroneCore
+from scheduler import ControlLoop
+from trajectory import T, VX
+
+
+def merge(schedules, delays=None, step=trajectory.STEP):
+    """
+    Merge the schedules of every drone on common ticks
+    A drone holds the command of its latest row for one step or until its next row,
+    and hovers before it starts and after it ends. The last tick hovers all the drones.
+
+    :param delays: Milliseconds each drone starts later than the first tick
+    """
+    delays = delays or [0] * len(schedules)
+    end = max(d + trajectory.duration(s) for s, d in zip(schedules, delays)) + step
+    t = trajectory.ticks(end, step)
+    if t[-1] < end:
+        t = np.append(t, end)
+
+    fleet = np.zeros((len(t), 1 + 4 * len(schedules)))
+    fleet[:, T] = t
+    for i, (sch, delay) in enumerate(zip(schedules, delays)):
+        own = sch[:, T] - sch[0, T] + delay
+        row = np.searchsorted(own, t, side="right") - 1
+        active = (row >= 0) & (t < own[-1] + step)
+        fleet[active, 1 + 4 * i:5 + 4 * i] = sch[row[active], VX:]
+    return fleet
+
+
+def rotate(sch, deg):
+    """The same schedule for a drone heading 'deg' clockwise from the others,so all fly the same way"""
+    sch = sch.copy()
+    a = np.radians(deg)
+    vx, vy = sch[:, VX].copy(), sch[:, VX + 1].copy()
+    sch[:, VX] = vx * np.cos(a) - vy * np.sin(a)
+    sch[:, VX + 1] = vx * np.sin(a) + vy * np.cos(a)
+    return sch
+
+
+class Fleet:
+    """
+    :param links: pyardrone.ARDrone or sim.SimDrone of every drone
+    :param rate: Commands per second of the control loop
+    :param keepalive: Seconds after which an unchanged command is sent again anyway
+
+    Every link gets a DroneCore of its own for what is done drone by drone:
+    taking off and landing(resending and waiting on navdata) and the ATTransport suppressing unchanged commands.
+    Their control loops stay idle,the moves of the fleet are played by the one of the fleet.
+    """
+    def __init__(self, links, clock=None, rate=20, keepalive=0.5):
+        self.links = list(links)
+        self.clock = clock or MonotonicClock()
+        self.step = 1000 / rate
+        self.max_v = 0.01
+        self.max_w = 0.12
+        self.halt = False
+
+        self.drones = [DroneCore(link=link, clock=self.clock, rate=rate) for link in self.links]
+        for drone in self.drones:
+            drone.link.keepalive = keepalive
+
+        self.loop = ControlLoop(self._send, self.step, self.clock)
+        self.loop.start()
+
+    @classmethod
+    def simulated(cls, n, clock=None, rate=20, **sim_kwargs):
+        """A fleet of n SimDrone on one clock"""
+        from sim import SimDrone
+        clock = clock or MonotonicClock()
+        return cls([SimDrone(clock=clock, **sim_kwargs) for _ in range(n)], clock, rate)
+
+    def __len__(self):
+        return len(self.links)
+
+    # Taking off and landing
+# ------------------------------------------------------
+    def takeoff(self, timeout=10, steady=True):
+        """
+        Every drone takes off as DroneCore.takeoff does
+        :return: A Future resolved with True when all of them fly(or hover steadily),False if one timed out
+        """
+        print("Fleet taking off...")
+        self.halt = False
+        return _all([drone.takeoff(timeout, steady) for drone in self.drones])
+
+    def land(self, timeout=10):
+        """
+        Stop the fleet at once,then every drone lands as DroneCore.land does
+        :return: A Future resolved with True when all of them are on the ground,False if one timed out
+        """
+        self.halt = True
+        self.loop.cancel()
+        print("Fleet landing...")
+        return _all([drone.land(timeout) for drone in self.drones])
+
+    def shutdown(self):
+        self.loop.close()
+        for drone in self.drones:
+            drone.loop.close()
+            drone.close()
+        print("Programme ends!")
+
+    # Moving
+# ------------------------------------------------------
+    def _send(self, row):
+        """Called by the control loop every tick with a row of the fleet schedule"""
+        for drone, (vx, vy, vz, w) in zip(self.drones, row[1:].reshape(-1, 4)):
+            if vx or vy or vz or w:
+                drone.link.move(forward=vy, right=vx, up=vz, cw=w)
+            else:
+                drone.link.hover()
+
+    def play(self, schedules, delays=None):
+        """
+        Fly one schedule per drone,or the same one for all,on common ticks
+        :return: A Future resolved with True when every drone is done,False if cancelled
+        """
+        if isinstance(schedules, np.ndarray):
+            schedules = [schedules] * len(self)
+        if len(schedules) != len(self):
+            raise ValueError("%d schedules for %d drones" % (len(schedules), len(self)))
+        future = Future()
+        if self.halt:
+            future.set_result(False)
+            return future
+
+        def done(finished):
+            print("Done")
+            if not future.done():
+                future.set_result(finished)
+
+        self.loop.submit(merge(schedules, delays, self.step), done, "fleet")
+        return future
+
+    def formation(self, shape, headings=None, delays=None, **params):
+        """
+        Every drone flies the same shape of trajectory.py where it is,so the formation keeps its form
+        :param shape: e.g. "square" or "circle"
+        :param headings: Degrees each drone heads clockwise from the first one,so all draw the shape the same way
+        :param delays: Milliseconds each drone starts later,e.g. to follow one another on a circle
+        """
+        build = getattr(trajectory, shape)
+        if "max_v" in inspect.signature(build).parameters:
+            params.setdefault("max_v", self.max_v)
+        sch = build(step=self.step, **params)
+        headings = headings or [0] * len(self)
+        print("Formation %s starts" % shape)
+        return self.play([rotate(sch, h) if h else sch for h in headings], delays)
+
+    def stats(self):
+        """stats() of the control loop,with the AT commands sent and suppressed by all the drones"""
+        stats = self.loop.stats()
+        links = [drone.link.stats() for drone in self.drones]
+        stats.update(commands=sum(s["commands"] for s in links), suppressed=sum(s["suppressed"] for s in links))
+        return stats
+
+
+def _all(futures):
+    """A Future resolved with True when all of 'futures' are resolved with True,with the first exception if any"""
+    future = Future()
+    left = len(futures)
+    lock = threading.Lock()
+
+    def one_done(_):
+        nonlocal left
+        with lock:
+            left -= 1
+            last = not left
+        if last:
+            try:
+                future.set_result(all(f.result() for f in futures))
+            except Exception as e:
+                future.set_exception(e)
+    if not futures:
+        future.set_result(True)
+    for f in futures:
+        f.add_done_callback(one_done)
+    return future
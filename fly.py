@@ -0,0 +1,199 @@
+"""
+Fly missions from the command line,without a window.
+
+Each item of the queue is a mission file(see mission.py) or a move of DroneCore with its parameters:
+    missions/square.jsonl   circle   circle:r=0.8,vertical=true   arc_move:v=0.1,r=0.6,deg=-180
+They are checked before taking off,flown back to back,then UAV lands.
+A line per item and a summary are printed,and the exit status tells how it went:
+0 all done,1 an item failed or timed out,2 UAV didn't take off,130 interrupted.
+
+Usage:
+    python fly.py missions/square.jsonl star --sim tau=300 --speed 10
+    python fly.py missions/tour.jsonl --backend drone --calibration calibration.json
+    python fly.py missions/square.jsonl four_leaves --repeat 50 --keep-going --out soak.json
+"""
+import argparse
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import mission
+from clock import MonotonicClock, ScaledClock
+from core import DroneCore
+
+MOVES = ["square", "triangle", "circle", "two_circle", "number_eight", "helix", "spiral_up", "star", "four_leaves",
+         "arc_move", "free_move", "turn", "climb", "settle"]
+
+OK, FAILED, NO_TAKEOFF, INTERRUPTED = 0, 1, 2, 130
+
+
+class Item:
+    """One entry of the queue: a mission file,or a move of DroneCore with its keyword arguments"""
+    def __init__(self, text):
+        self.text = text
+        name, _, params = text.partition(":")
+        if name.endswith(".jsonl") or os.path.isfile(name):
+            self.mission, self.move, self.params = name, None, {}
+        else:
+            self.mission, self.move, self.params = None, name, _params(params)
+
+    def check(self):
+        """Raise before taking off rather than in the air: the mission compiles,or the move takes these parameters"""
+        if self.mission is not None:
+            mission.compile_mission(self.mission)
+        elif self.move not in MOVES:
+            raise ValueError("unknown move %r,choose from %s" % (self.move, ", ".join(MOVES)))
+        else:
+            try:
+                inspect.signature(getattr(DroneCore, self.move)).bind(None, **self.params)
+            except TypeError as e:
+                raise TypeError("%s: %s" % (self.text, e)) from None
+
+    def start(self, drone):
+        """:return: The Future of the move"""
+        if self.mission is not None:
+            return drone.run_mission(self.mission)
+        return getattr(drone, self.move)(**self.params)
+
+
+def _params(text):
+    """'r=0.8,vertical=true' -> {'r': 0.8,'vertical': True},values are JSON or else strings"""
+    params = {}
+    for item in filter(None, text.split(",")):
+        name, _, value = item.partition("=")
+        try:
+            params[name] = json.loads(value)
+        except ValueError:
+            params[name] = value
+    return params
+
+
+def make_drone(backend, speed=1.0, sim_kwargs=None, rate=20):
+    """
+    :param backend: "sim" for sim.SimDrone,"drone" for the real UAV
+    :param speed: Times real time,for the simulated drone only
+    """
+    if backend == "drone":
+        return DroneCore(rate=rate)
+    from sim import SimDrone
+    clock = ScaledClock(speed) if speed != 1 else MonotonicClock()
+    return DroneCore(link=SimDrone(clock=clock, **(sim_kwargs or {})), clock=clock, rate=rate)
+
+
+def fly(drone, items, timeout=600, keep_going=False):
+    """
+    Fly the items one after another,taking off before the first and after any failure
+    :param timeout: Wall seconds an item may take
+    :param keep_going: Whether to go on with the queue after an item failed
+    :return: (exit status,list of a dict per item flown)
+    """
+    results = []
+    try:
+        status = _fly(drone, items, timeout, keep_going, results)
+    except KeyboardInterrupt:
+        status = INTERRUPTED
+    if drone.state.fly_mask:
+        drone.land().result()
+    return status, results
+
+
+def _fly(drone, items, timeout, keep_going, results):
+    flying = False
+    for item in items:
+        if not flying:
+            if not drone.takeoff().result():
+                return NO_TAKEOFF
+            flying = True
+
+        drone.loop.reset_stats()
+        start, wall = drone.clock.now(), time.monotonic()
+        status = "ok"
+        try:
+            if not item.start(drone).result(timeout):
+                status = "cancelled"
+        except TimeoutError:
+            status = "timeout"
+        except Exception as e:
+            status = "error: %s" % e
+        stats = drone.loop.stats()
+        results.append({
+            "item": item.text,
+            "status": status,
+            "flight_s": drone.clock.now() - start,
+            "wall_s": time.monotonic() - wall,
+            "ticks": stats["ticks"],
+            "skipped": stats["skipped"],
+            "lateness_p99_ms": stats["p99_lateness"],
+        })
+
+        if status != "ok":
+            drone.land().result()  # stops whatever is still flying
+            flying = False
+            if not keep_going:
+                break
+    failed = any(r["status"] != "ok" for r in results) or len(results) < len(items)
+    return FAILED if failed else OK
+
+
+def summary(results, status):
+    lines = ["%-32s %-10s %8.1fs flight %8.1fs wall  %5d ticks  %3d skipped  lateness p99 %6.2fms"
+             % (r["item"][-32:], r["status"][:10], r["flight_s"], r["wall_s"], r["ticks"], r["skipped"],
+                r["lateness_p99_ms"]) for r in results]
+    done = sum(r["status"] == "ok" for r in results)
+    lines.append("%d/%d done,%.1fs flight in %.1fs,exit status %d"
+                 % (done, len(results), sum(r["flight_s"] for r in results),
+                    sum(r["wall_s"] for r in results), status))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("items", nargs="+", metavar="ITEM", help="mission file,or move[:name=value,...]")
+    parser.add_argument("--backend", choices=["sim", "drone"], default="sim")
+    parser.add_argument("--sim", nargs="+", metavar="NAME=VALUE", help="the simulated drone,e.g. tau=300")
+    parser.add_argument("--speed", type=float, default=1.0, help="times real time,for the simulated drone")
+    parser.add_argument("--rate", type=float, default=20, help="commands per second of the control loop")
+    parser.add_argument("--calibration", help="constants written by calibrate.py")
+    parser.add_argument("--record", help="record the flight into this log(see recorder.py)")
+    parser.add_argument("--repeat", type=int, default=1, help="fly the whole queue this many times")
+    parser.add_argument("--timeout", type=float, default=600, help="wall seconds an item may take")
+    parser.add_argument("--keep-going", action="store_true", help="go on with the queue after a failure")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    items = [Item(text) for text in args.items] * args.repeat
+    try:
+        for item in items[:len(args.items)]:
+            item.check()
+    except (OSError, mission.MissionError, ValueError, TypeError, ArithmeticError) as e:
+        parser.error(str(e))
+    if args.backend == "drone" and args.speed != 1:
+        parser.error("--speed is for the simulated drone only")
+
+    sim_kwargs = {name: float(value) for name, _, value in (s.partition("=") for s in args.sim or [])}
+    drone = make_drone(args.backend, args.speed, sim_kwargs, args.rate)
+    if args.calibration:
+        drone.load_calibration(args.calibration)
+    if args.record:
+        drone.record(args.record)
+    threading.Thread(target=drone.run, daemon=True).start()  # for the moves using drone.events
+
+    start = time.monotonic()
+    try:
+        status, results = fly(drone, items, args.timeout, args.keep_going)
+    finally:
+        drone.shutdown()
+
+    print(summary(results, status))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"status": status, "wall_s": time.monotonic() - start, "items": results}, f, indent=2)
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
@@ -116,55 +116,6 @@ def spiral_up(self, v, max_r, first_in=True):
     """
     pass
 
-def curve_move(self, x, y, z, ms_period):
-    """
-    x,y,z are three parameter functions of time
-    so that at time t,UAV will be at the coordinate (x,y,z)
-    """
-    steps = 1000
-    dt = ms_period / steps
-    for t in range(0, ms_period, steps):
-        dx = x(t+dt) - x(t)
-        dy = y(t+dt) - y(t)
-        dz = z(t+dt) - z(t)
-        desti = (dx, dy, dz)
-        self.move_by_vector(desti, dt)
-
 def show_navdata(self):
     self.send(at.CONFIG('general:navdata_demo', True))
     print(self.state)
-
-def clear_controller(self):
-    """Clear the data of vx\vy\vz_ctrl"""
-    print("Controller cleared.")
-    self.vx_ctrl.clear()
-    self.vy_ctrl.clear()
-    self.vz_ctrl.clear()
-
-def speed_offset(self, vx, vy):
-    """
-    Call for PIDController to get the speed offset to rectify the current speed(in m/ms)
-    vz control is not included since ARDrone already has complete vz control
-    """
-    # data reported by UAV
-    real_vx = -self.navdata.demo.vx
-    real_vy = self.navdata.demo.vy  # convert from mm/s to m/ms
-
-    real_vx /= self.max_v
-    real_vy /= self.max_v
-
-    real_vx /= 1e6
-    real_vy /= 1e6  # convert from mm/s to m/ms
-
-    print("In speed_offset")
-    print("\treal_vx:%.4f,real_vy:%.4f" % (real_vx, real_vy))
-    print("\tvx:%.4f,vy:%.4f" % (vx, vy))
-
-    # Rectify speed
-    dx = self.vx_ctrl.delta(real_vx-vx)
-    dy = self.vy_ctrl.delta(real_vy-vy)
-
-    print("\tdelta_x:%.5f,delta_y:%.5f" % (dx, dy))
-
-    # return dx, dy
-    return 0, 0
@@ -0,0 +1,179 @@
+"""
+Live metrics of the control loop,cheap enough to stay on at 100 ticks per second.
+
+Every tick is counted under the label of the move which sent it(free_move, arc_move, function_move, square...):
+* interval: ms since the previous tick,a gap between two moves shows up here too
+* lateness: ms after its deadline the tick was sent
+* navdata_age: ms since the latest navdata packet,when the link tells it
+* overruns: ticks later than one step,i.e. the next tick was due already
+Besides,the time spent in user functions(function_move/curve_move) and the steps and polls of move_seq.
+
+A tick is a few bisects into fixed buckets,nothing is allocated.
+Read them with DroneCore.metrics.snapshot(),or over HTTP after DroneCore.serve_metrics():
+    curl localhost:8765/metrics       # text,one value per line
+    curl localhost:8765/metrics.json
+"""
+import json
+import threading
+from bisect import bisect_left
+
+BUCKETS = (0.1, 0.2, 0.5, 1, 2, 3, 5, 7.5, 10, 10.5, 12.5, 15, 20, 25, 30, 40, 50, 50.5, 60, 75,
+           100, 150, 200, 250, 500, 1000)  # ms,upper bounds,finer around the usual tick intervals
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one counts what is above every bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """The q-quantile,interpolated in the bucket holding it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.bounds, self.counts):
+            if n and seen + n >= rank:
+                return min(lower + (bound - lower) * (rank - seen) / n, self.max)
+            seen += n
+            lower = bound
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": dict(zip([str(b) for b in self.bounds] + ["inf"], self.counts)),
+        }
+
+
+class MoveMetrics:
+    """The metrics of the ticks of one label"""
+    __slots__ = ("ticks", "overruns", "interval", "lateness", "navdata_age")
+
+    def __init__(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.interval = Histogram()
+        self.lateness = Histogram()
+        self.navdata_age = Histogram()
+
+    def snapshot(self):
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "interval_ms": self.interval.snapshot(),
+            "lateness_ms": self.lateness.snapshot(),
+            "navdata_age_ms": self.navdata_age.snapshot(),
+        }
+
+
+class Metrics:
+    """
+    Written by the control loop only,so no lock on the hot path
+    Readers in other threads may see a tick half counted,which is fine for monitoring
+    """
+    def __init__(self):
+        self.moves = {}
+        self.callback = Histogram()  # ms spent in user functions per move
+        self.counters = {}
+        self._last_tick = None
+
+    def tick(self, label, now, lateness, step, navdata_age=None):
+        """
+        Called by DroneCore every tick
+        :param now: Second
+        :param lateness: ms
+        :param step: ms,a tick later than that is an overrun
+        :param navdata_age: ms,None if unknown
+        """
+        move = self.moves.get(label)
+        if move is None:
+            move = self.moves[label] = MoveMetrics()
+        move.ticks += 1
+        if self._last_tick is not None:
+            move.interval.observe((now - self._last_tick) * 1000)
+        self._last_tick = now
+        move.lateness.observe(lateness)
+        if lateness > step:
+            move.overruns += 1
+        if navdata_age is not None:
+            move.navdata_age.observe(navdata_age)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def clear(self):
+        self.__init__()
+
+    def snapshot(self):
+        return {
+            "moves": {label: move.snapshot() for label, move in list(self.moves.items())},
+            "callback_ms": self.callback.snapshot(),
+            "counters": dict(self.counters),
+        }
+
+
+def text(snapshot, prefix="mydrone"):
+    """One 'name{labels} value' per line,the format of Prometheus"""
+    lines = []
+
+    def histogram(name, labels, h):
+        for key in ("count", "mean", "p50", "p99", "max"):
+            lines.append("%s_%s_%s%s %g" % (prefix, name, key, labels, h[key]))
+
+    for label, move in sorted(snapshot["moves"].items()):
+        labels = '{move="%s"}' % label
+        lines.append("%s_ticks%s %d" % (prefix, labels, move["ticks"]))
+        lines.append("%s_overruns%s %d" % (prefix, labels, move["overruns"]))
+        for name in ("interval_ms", "lateness_ms", "navdata_age_ms"):
+            histogram(name, labels, move[name])
+    histogram("callback_ms", "", snapshot["callback_ms"])
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append("%s_%s %g" % (prefix, name.replace(".", "_"), value))
+    return "\n".join(lines) + "\n"
+
+
+def serve(snapshot, host="127.0.0.1", port=8765):
+    """
+    Serve snapshot() on /metrics(text) and /metrics.json in a thread
+    :return: The server,call shutdown() on it to stop
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only a served drone needs it
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, kind = text(snapshot()).encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, kind = json.dumps(snapshot(), indent=2).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # no line per request on the console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
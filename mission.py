@@ -0,0 +1,279 @@
+"""
+Missions as files rather than lists of closures.
+
+A mission file is JSON Lines: one JSON object per line,so it can be stored,diffed and validated,
+and a mission of thousands of segments is read one line at a time while flying.
+An optional first line names the mission and the pause(ms of hovering) between segments,
+the others are segments with a 'type' and the parameters of the DroneCore move of the same name.
+Blank lines and lines starting with '#' are ignored.
+
+    {"mission": "square", "pause": 1500}
+    {"type": "line", "vy": 0.2, "ms_period": 600}
+    {"type": "line", "vx": 0.2, "ms_period": 600}
+    {"type": "arc", "v": 0.1, "r": 0.6, "deg": -180}
+    {"type": "turn", "w": 0.5, "ms_period": 1000}
+    {"type": "climb", "v": 0.2, "ms_period": 1000}
+    {"type": "hover", "ms_period": 2000}
+    {"type": "function", "vx": "0.1*cos(t)", "vy": "0.1*sin(t)", "ms_period": 6000}
+    {"type": "waypoints", "points": [[0, 1, 0], [1, 1, 0.5]], "v": 0.2}
+
+Function segments are expressions of t in second,written with the names of FUNCTIONS below.
+Run a mission with DroneCore.run_mission,or check one with
+    python mission.py missions/square.jsonl
+"""
+import argparse
+import ast
+import json
+import math
+
+import numpy as np
+
+import curve
+import trajectory
+
+FUNCTIONS = {name: getattr(np, name) for name in
+             ("sin", "cos", "tan", "arcsin", "arccos", "arctan", "sqrt", "exp", "log", "abs", "where",
+              "minimum", "maximum", "clip", "pi")}
+
+# type -> {parameter: default},None for a required parameter
+SEGMENTS = {
+    "line": {"vx": 0.0, "vy": 0.0, "vz": 0.0, "w": 0.0, "ms_period": None},
+    "arc": {"v": None, "r": None, "deg": None, "start_angle": 0.0, "vertical": False},
+    "turn": {"w": None, "ms_period": 1000},
+    "climb": {"v": None, "ms_period": 1000},
+    "hover": {"ms_period": 1500},
+    "function": {"vx": "0", "vy": "0", "vz": "0", "ms_period": None},
+    "waypoints": {"points": None, "v": 0.2, "accel": 1.0},
+}
+
+# Limits of the numbers,(low,high,whether the bounds themselves are allowed)
+SPEED = (-1.0, 1.0, True)  # percentage of the max speed,as every move of DroneCore asserts
+LIMITS = {
+    "vx": SPEED, "vy": SPEED, "vz": SPEED, "w": SPEED, "v": SPEED,
+    "ms_period": (0.0, float("inf"), True),
+    "r": (0.0, float("inf"), False),
+    "accel": (0.0, float("inf"), False),
+    "pause": (0.0, float("inf"), True),
+}
+HEADER = ("mission", "pause")
+
+
+class MissionError(ValueError):
+    """A mission file which can't be flown,the message tells the line"""
+
+
+# Parsing
+# ------------------------------------------------------
+# The only syntax of an expression: arithmetic,comparisons,'a if c else b' and calls of FUNCTIONS
+_SYNTAX = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Constant, ast.Call, ast.Name,
+           ast.Load, ast.operator, ast.unaryop, ast.cmpop)
+
+
+def _expression(text, where):
+    """
+    A function of t from an expression,checked on its syntax tree before it is compiled
+    so attributes,subscripts,comprehensions and lambdas never run
+    """
+    try:
+        tree = ast.parse(str(text), where, "eval")
+    except SyntaxError as e:
+        raise MissionError("%s: bad expression %r: %s" % (where, text, e.msg))
+    unknown = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _SYNTAX):
+            raise MissionError("%s: %s is not allowed in %r" % (where, type(node).__name__, text))
+        if isinstance(node, ast.Name) and node.id != "t" and node.id not in FUNCTIONS:
+            unknown.add(node.id)
+        elif isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.keywords
+                                             or not callable(FUNCTIONS.get(node.func.id))):
+            raise MissionError("%s: only the functions of FUNCTIONS may be called in %r" % (where, text))
+        elif isinstance(node, ast.Constant) and (isinstance(node.value, bool)
+                                                 or not isinstance(node.value, (int, float))):
+            raise MissionError("%s: %r is not a number in %r" % (where, node.value, text))
+    if unknown:
+        raise MissionError("%s: unknown names %s in %r" % (where, ", ".join(sorted(unknown)), text))
+    code = compile(tree, where, "eval")
+
+    def f(t):
+        return eval(code, {"__builtins__": {}}, dict(FUNCTIONS, t=t))
+    return f
+
+
+def segment(obj, where="<segment>"):
+    """Check one segment and fill in its defaults"""
+    if not isinstance(obj, dict) or obj.get("type") not in SEGMENTS:
+        raise MissionError("%s: 'type' should be one of %s" % (where, ", ".join(SEGMENTS)))
+    spec = SEGMENTS[obj["type"]]
+    unknown = set(obj) - set(spec) - {"type"}
+    if unknown:
+        raise MissionError("%s: unknown parameters %s for %s" % (where, ", ".join(sorted(unknown)), obj["type"]))
+    seg = {"type": obj["type"]}
+    for name, default in spec.items():
+        value = obj.get(name, default)
+        if value is None:
+            raise MissionError("%s: %s needs '%s'" % (where, obj["type"], name))
+        if isinstance(default, bool):
+            value = bool(value)
+        elif isinstance(default, str):
+            value = _expression(value, "%s:%s" % (where, name))
+        elif name == "points":
+            try:
+                value = [tuple(map(float, p)) for p in value]
+            except (TypeError, ValueError):
+                value = None
+            if not value or any(len(p) != 3 or not all(map(math.isfinite, p)) for p in value):
+                raise MissionError("%s: points should be a list of (x, y, z)" % where)
+        else:
+            _number(value, name, where)
+        seg[name] = value
+    if seg["type"] == "arc" and seg["v"] == 0 or seg["type"] == "waypoints" and seg["v"] <= 0:
+        raise MissionError("%s: 'v' of %s can't be %s" % (where, seg["type"], seg["v"]))
+    return seg
+
+
+def _number(value, name, where):
+    """Raise unless value is a number within LIMITS[name]"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise MissionError("%s: '%s' should be a number" % (where, name))
+    low, high, closed = LIMITS.get(name, (-math.inf, math.inf, True))
+    if not (low <= value <= high if closed else low < value < high):
+        raise MissionError("%s: '%s' should be %s %s and %s %s,not %s"
+                           % (where, name, ">=" if closed else ">", low, "<=" if closed else "<", high, value))
+
+
+def read(lines, name="<mission>"):
+    """
+    Parse a mission lazily,line by line
+    :param lines: An iterable of lines,e.g. an open file
+    :return: (header, generator of segments),the header is read at once
+    """
+    lines = iter(enumerate(lines, 1))
+    header = {"mission": name, "pause": 0}
+    first = None
+    for number, line in lines:
+        obj = _parse(line, "%s:%d" % (name, number))
+        if obj is None:
+            continue
+        if "mission" in obj:
+            header.update(_header(obj, "%s:%d" % (name, number)))
+        else:
+            first = segment(obj, "%s:%d" % (name, number))
+        break
+
+    def segments():
+        if first is not None:
+            yield first
+        for number, line in lines:
+            obj = _parse(line, "%s:%d" % (name, number))
+            if obj is not None:
+                yield segment(obj, "%s:%d" % (name, number))
+    return header, segments()
+
+
+def _header(obj, where):
+    unknown = set(obj) - set(HEADER)
+    if unknown:
+        raise MissionError("%s: unknown header %s,it has %s" % (where, ", ".join(sorted(unknown)), ", ".join(HEADER)))
+    if not isinstance(obj["mission"], str):
+        raise MissionError("%s: 'mission' should be a name" % where)
+    if "pause" in obj:
+        _number(obj["pause"], "pause", where)
+    return obj
+
+
+def _parse(line, where):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise MissionError("%s: %s" % (where, e))
+
+
+def open_mission(path):
+    """read() a mission file,the file is closed when its segments are exhausted"""
+    f = open(path)
+    try:
+        header, segments = read(f, path)
+    except Exception:
+        f.close()
+        raise
+
+    def closing():
+        with f:
+            yield from segments
+    return header, closing()
+
+
+# Compiling
+# ------------------------------------------------------
+def compile_segment(seg, max_v=0.01, step=trajectory.STEP, vertical_gain=4):
+    """The schedule of one segment,max_v and vertical_gain as calibrated on DroneCore"""
+    kind = seg["type"]
+    if kind == "line":
+        return trajectory.line(seg["vx"], seg["vy"], seg["vz"], seg["w"], seg["ms_period"], step)
+    if kind == "arc":
+        return trajectory.arc_move(seg["v"], seg["r"], seg["deg"], seg["start_angle"], seg["vertical"], max_v, step,
+                                    vertical_gain)
+    if kind == "turn":
+        return trajectory.line(0, 0, 0, seg["w"], seg["ms_period"], step)
+    if kind == "climb":
+        return trajectory.line(0, 0, seg["v"], 0, seg["ms_period"], step)
+    if kind == "hover":
+        return trajectory.hover(seg["ms_period"], step)
+    if kind == "function":
+        try:
+            sch = trajectory.function(seg["vx"], seg["vy"], seg["vz"], seg["ms_period"], step)
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise MissionError("function segment: %s" % e)
+        speeds = sch[:, trajectory.VX:]
+        if not np.isfinite(speeds).all() or np.abs(speeds).max() > 1:
+            raise MissionError("function segment: speeds should stay within [-1, 1]")
+        return sch
+    if kind == "waypoints":
+        points = [(0.0, 0.0, 0.0)] + seg["points"]
+        return curve.waypoints(points, seg["v"], seg["accel"], max_v, vertical_gain, step)
+    raise MissionError("unknown segment %r" % kind)
+
+
+def schedules(header, segments, max_v=0.01, step=trajectory.STEP, vertical_gain=4):
+    """Compile segments one at a time,with the pause of the header in between"""
+    pause = header.get("pause", 0)
+    for i, seg in enumerate(segments):
+        if i and pause:
+            yield trajectory.hover(pause, step)
+        yield compile_segment(seg, max_v, step, vertical_gain)
+
+
+def compile_mission(path, max_v=0.01, step=trajectory.STEP, vertical_gain=4):
+    """The whole mission as one schedule,to inspect or cache it"""
+    header, segments = open_mission(path)
+    return trajectory.chain(list(schedules(header, segments, max_v, step, vertical_gain)), step=step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check mission files and tell how long they fly")
+    parser.add_argument("missions", nargs="+")
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.missions:
+        try:
+            header, segments = open_mission(path)
+            count, ms, end = 0, 0.0, np.zeros(3)
+            for sch in schedules(header, segments):
+                count += 1
+                ms += trajectory.duration(sch) + trajectory.STEP
+                end += trajectory.path(sch)[-1]
+        except (OSError, MissionError) as e:
+            print(e)
+            failed = True
+            continue
+        print("%s: %s,%d schedules,%.1fs,ends at x:%.2fm y:%.2fm z:%.2fm"
+              % (path, header["mission"], count, ms / 1000, *end))
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+PID controller used to rectify the speed of UAV from navdata,one per axis.
+"""
+
+
+class PIDController:
+    """
+    delta() returns the offset to add to the command so that the measured speed follows the commanded one
+    Errors and outputs are in speed percentage,dt in second
+
+    Cheap enough to run on every tick: a few float operations,no allocation
+    """
+    __slots__ = ("kp", "ki", "kd", "limit", "integral", "last_error")
+
+    def __init__(self, kp=0.5, ki=1.0, kd=0.0, limit=0.2):
+        """:param limit: Max absolute offset,the integral is clamped too to prevent windup"""
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.limit = limit
+        self.integral = 0.0
+        self.last_error = None
+
+    def delta(self, error, dt):
+        """:param error: commanded - measured"""
+        if self.ki:
+            self.integral += error * dt
+            bound = self.limit / self.ki
+            self.integral = min(max(self.integral, -bound), bound)
+
+        derivative = 0.0
+        if self.kd and self.last_error is not None and dt > 0:
+            derivative = (error - self.last_error) / dt
+        self.last_error = error
+
+        out = self.kp * error + self.ki * self.integral + self.kd * derivative
+        return min(max(out, -self.limit), self.limit)
+
+    def clear(self):
+        self.integral = 0.0
+        self.last_error = None
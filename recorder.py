@@ -0,0 +1,176 @@
+"""
+Binary flight recorder.
+
+Every tick of the control loop appends one fixed-size record to a memory-mapped file:
+the time,the command planned and the one sent,the lateness of the tick and the latest navdata.
+Recording is a plain memory write on the hot path(under a lock only close() contends for),
+growing and flushing the file is done by a thread of the recorder.
+
+Read a flight back as arrays:
+    rec = recorder.load("flight.rec")
+    rec["time"], rec["vx"], rec["nav_vx"], ...
+
+Which move each tick belongs to is written beside the log,in "flight.rec.moves"(JSON Lines):
+a first line of metadata,e.g. the calibration of DroneCore,then one line per move as it starts,
+with the index of its first record,so the schedules can be compiled again(see replay.py):
+    meta, moves = recorder.load_moves("flight.rec")
+"""
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b"MYDRREC1"
+HEADER = struct.Struct("<8sIQ")  # magic, record size, number of records
+HEADER_SIZE = 64  # the header is padded so that records are aligned
+
+RECORD = np.dtype([
+    ("time", "<f8"),  # s,on the clock of the control loop
+    ("vx", "<f4"),  # speed percentage of the schedule,right
+    ("vy", "<f4"),  # forward
+    ("vz", "<f4"),  # up
+    ("w", "<f4"),  # clockwise
+    ("sent_vx", "<f4"),  # vx and vy actually sent,they differ in closed loop
+    ("sent_vy", "<f4"),
+    ("lateness", "<f4"),  # ms
+    ("nav_vx", "<f4"),  # navdata.demo.vx/vy/vz,mm/s
+    ("nav_vy", "<f4"),
+    ("nav_vz", "<f4"),
+    ("altitude", "<f4"),  # m
+    ("yaw", "<f4"),  # deg
+    ("fly", "<u4"),  # state.fly_mask
+])
+
+
+class FlightRecorder:
+    """
+    :param path: The file to write,it is overwritten
+    :param chunk: Records the file grows by
+    :param interval: Seconds between two flushes
+    :param meta: What goes into the first line of the moves file
+    """
+    def __init__(self, path, chunk=4096, interval=1.0, meta=None):
+        self.path = path
+        self.chunk = chunk
+        self.interval = interval
+        self.count = 0
+        self.dropped = 0  # records lost because the file didn't grow in time
+
+        self._file = open(path, "w+b")
+        self._lock = threading.Lock()  # close() doesn't truncate the file under a record being written
+        self._capacity = 0
+        self._buf = None
+        self._grow()
+
+        self._moves = open(moves_path(path), "w")
+        self._moves.write(json.dumps(meta or {}) + "\n")
+        self._marks = []  # moves not written yet
+        self._written = 0
+
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._flusher, daemon=True)
+        self._thread.start()
+
+    def record(self, time, vx, vy, vz, w, lateness=0.0, navdata=None, fly=True, sent_vx=None, sent_vy=None):
+        """Called on the hot path,one record per tick,it is ignored once the recorder is closed"""
+        sent_vx = vx if sent_vx is None else sent_vx
+        sent_vy = vy if sent_vy is None else sent_vy
+        if navdata is not None:
+            demo = navdata.demo
+            rec = (time, vx, vy, vz, w, sent_vx, sent_vy, lateness, demo.vx, demo.vy, demo.vz,
+                   demo.altitude / 100, demo.psi / 1000, fly)
+        else:
+            rec = (time, vx, vy, vz, w, sent_vx, sent_vy, lateness, 0, 0, 0, 0, 0, fly)
+        with self._lock:
+            buf = self._buf
+            if buf is None:
+                return
+            n = self.count
+            if n >= len(buf):
+                self.dropped += 1
+                return
+            buf[n] = rec
+            self.count = n + 1
+
+    def mark(self, tick, **move):
+        """The record 'tick' and the following ones belong to this move,e.g. label="circle",params={...}"""
+        self._marks.append(dict(move, tick=tick))
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+        with self._lock:
+            self._write_header()
+            self._buf.flush()
+            self._buf = None
+        self._file.truncate(HEADER_SIZE + self.count * RECORD.itemsize)
+        self._file.close()
+        self._write_marks()
+        self._moves.close()
+
+    # Off the hot path
+# ------------------------------------------------------
+    def _grow(self):
+        """Extend the file and map it again,the old map stays valid until it is replaced"""
+        self._capacity += self.chunk
+        self._file.truncate(HEADER_SIZE + self._capacity * RECORD.itemsize)
+        self._write_header()
+        self._buf = np.memmap(self._file, dtype=RECORD, mode="r+", offset=HEADER_SIZE, shape=(self._capacity,))
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, RECORD.itemsize, self.count).ljust(HEADER_SIZE, b"\0"))
+        self._file.flush()
+
+    def _flusher(self):
+        while not self._closed.wait(self.interval / 4):
+            if self.count > self._capacity // 2:
+                self._grow()
+            self._buf.flush()
+            self._write_header()
+            self._write_marks()
+
+    def _write_marks(self):
+        marks = self._marks[self._written:]
+        for move in marks:
+            try:
+                line = json.dumps(move, default=float)
+            except (TypeError, ValueError):  # e.g. the functions of function_move
+                line = json.dumps(dict(move, params=None), default=float)
+            self._moves.write(line + "\n")
+        self._written += len(marks)
+        self._moves.flush()
+
+
+def moves_path(path):
+    return path + ".moves"
+
+
+def load_moves(path):
+    """
+    (metadata,list of the moves) of a flight log,every move a dict with the index 'tick' of its first record
+    (None, []) if the log has no moves file
+    """
+    try:
+        with open(moves_path(path)) as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return None, []
+    return (lines[0], lines[1:]) if lines else (None, [])
+
+
+def load(path):
+    """Load a flight log as a structured array(memory-mapped,read-only),one row per tick"""
+    with open(path, "rb") as f:
+        magic, size, count = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or size != RECORD.itemsize:
+        raise ValueError("%s is not a flight log of this version" % path)
+    available = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize
+    count = min(count, available)
+    if not count:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(count,))
@@ -0,0 +1,215 @@
+"""
+Replay recorded flights(see recorder.py) on the simulated drone,faster than real time.
+
+The commands planned in a flight log are turned back into a schedule and played through DroneCore,
+so the control loop,the closed loop and the transport run exactly as in the air.
+The replay is recorded too and compared with the navdata of the original flight.
+
+The replay flies the command stream as recorded. How the moves are compiled is checked apart:
+every move of the log(see recorder.load_moves) is compiled again by the DroneCore of today,
+with the calibration of the flight,and compared row by row with the commands recorded,
+so a change of arc_move,trajectory.py or curve.py shows up as a mismatch(see check_compilation).
+Moves which can't be compiled again(function_move,a sequence blended by move_seq,missions...) are skipped,
+and so are the ticks a layer was laid over(see DroneCore.together).
+
+    result = replay.replay("flight.rec", speed=10)  # 10 times real time
+    result = replay.replay("flight.rec")  # as fast as possible
+    result["velocity_error"], result["replay"]["nav_vx"], result["compilation"]["mismatches"], ...
+
+Usage:
+    python replay.py flight1.rec flight2.rec --speed 10 --closed-loop
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import recorder
+import trajectory
+from clock import ScaledClock, VirtualClock
+from core import CALIBRATION, DroneCore
+from sim import SimDrone
+
+
+def _deadlines(rec):
+    """Seconds from the first tick,on the deadlines of the ticks rather than when they were sent"""
+    deadline = rec["time"] - rec["lateness"] / 1000
+    return deadline - deadline[0]
+
+
+def schedule_of(rec):
+    """
+    The schedule of a flight log,i.e. the planned command of every tick while flying
+    Rows are timed on the deadline of their tick(the time minus the lateness),as the control loop planned them
+    """
+    rec = rec[rec["fly"] != 0]
+    sch = np.empty((len(rec), 5))
+    sch[:, trajectory.T] = _deadlines(rec) * 1000 if len(rec) else 0
+    for col, name in zip(range(trajectory.VX, trajectory.W + 1), ("vx", "vy", "vz", "w")):
+        sch[:, col] = rec[name]
+    return sch
+
+
+def velocity_error(original, replayed):
+    """
+    RMS difference of navdata velocity between two logs of the same schedule,in mm/s
+    The logs are aligned on the deadline of their ticks,the replayed navdata is interpolated at the original ones,
+    so ticks skipped or added in either log don't shift one against the other
+    """
+    original = original[original["fly"] != 0]
+    replayed = replayed[replayed["fly"] != 0]
+    if not len(original) or not len(replayed):
+        return 0.0
+    t, t_replayed = _deadlines(original), _deadlines(replayed)
+    both = t <= t_replayed[-1]
+    diff = np.stack([original[k][both] - np.interp(t[both], t_replayed, replayed[k])
+                     for k in ("nav_vx", "nav_vy", "nav_vz")], axis=1)
+    return float(np.sqrt((diff ** 2).sum(axis=1).mean()))
+
+
+class _Compiler(DroneCore):
+    """A DroneCore whose moves are compiled but never flown"""
+    def __init__(self, meta):
+        super().__init__(link=SimDrone(), rate=1000 / meta["step"], adaptive=meta["adaptive"],
+                         min_rate=1000 / meta["max_step"])
+        for name in CALIBRATION[:5]:
+            setattr(self, name, meta[name])
+        self.compiled = None
+
+    def _submit(self, schedule, label=None, params=None):
+        self.compiled = schedule
+        future = Future()
+        future.set_result(True)
+        return future
+
+    def compile(self, label, params):
+        """The schedule the move 'label' flies with these parameters,None if it isn't a move"""
+        self.compiled = None
+        move = getattr(self, label, None)
+        if callable(move):
+            move(**params)
+        return self.compiled
+
+
+def check_compilation(path, tolerance=1e-4):
+    """
+    Compile the moves of a flight log again and compare them with the commands recorded
+    :param tolerance: Speed percentage two commands may differ by,the log keeps them in float32
+    :return: A dict with the number of moves compared and skipped,and the mismatches: (label,tick,error)
+             where error is the largest difference of speed,inf if the rows aren't timed the same.
+             None if the log has no moves file
+    """
+    meta, moves = recorder.load_moves(path)
+    if meta is None or not all(name in meta for name in CALIBRATION):
+        return None
+    log = recorder.load(path)
+    deadline = log["time"] - log["lateness"] / 1000
+    planned = np.stack([log[name] for name in ("vx", "vy", "vz", "w")], axis=1)
+
+    layered = np.zeros(len(log), dtype=bool)
+    for move in moves:
+        if move.get("layer"):
+            layered |= (deadline >= move["start"] - 1e-6) & (deadline < move["start"] + move["ms"] / 1000 - 1e-6)
+    jobs = [move for move in moves if not move.get("layer")]
+
+    compiler = _Compiler(meta)
+    compared, skipped, mismatches = 0, 0, []
+    try:
+        for i, move in enumerate(jobs):
+            end = jobs[i + 1]["tick"] if i + 1 < len(jobs) else len(log)
+            ticks = np.arange(move["tick"], min(end, len(log)))
+            ticks = ticks[~layered[ticks]]
+            schedule = compiler.compile(move["label"], move["params"]) if move["params"] is not None else None
+            if schedule is None:
+                skipped += 1
+                continue
+            compared += 1
+            if not len(ticks):
+                continue
+            t = schedule[:, trajectory.T] - schedule[0, trajectory.T]
+            offset = (deadline[ticks] - move["start"]) * 1000
+            rows = np.clip(np.searchsorted(t, offset - 0.5), 0, len(t) - 1)
+            if np.abs(t[rows] - offset).max() > 0.5:
+                error = float("inf")
+            else:
+                error = float(np.abs(schedule[rows, trajectory.VX:] - planned[ticks]).max())
+            if error > tolerance:
+                mismatches.append((move["label"], int(move["tick"]), error))
+    finally:
+        compiler.shutdown()
+    return {"moves": compared, "skipped": skipped, "mismatches": mismatches}
+
+
+def replay(path, speed=None, closed_loop=False, out=None, **sim_kwargs):
+    """
+    Fly a recorded flight again on SimDrone
+
+    :param path: The flight log,or an array loaded by recorder.load
+    :param speed: Times faster than real time,None for as fast as possible
+    :param closed_loop: Whether DroneCore corrects the speed from navdata,to A/B the controller
+    :param out: Where the log of the replay goes,None for a temporary file
+    :return: A dict with the replay log,its error against the original,the wall time it took
+             and check_compilation of the log(None if 'path' is an array)
+    """
+    original = recorder.load(path) if isinstance(path, str) else path
+    schedule = schedule_of(original)
+    if not len(schedule):
+        raise ValueError("the flight log has no tick while flying")
+
+    clock = VirtualClock() if speed is None else ScaledClock(speed)
+    sim_kwargs.setdefault("takeoff_ms", 0)
+    sim = SimDrone(clock=clock, **sim_kwargs)
+    drone = DroneCore(link=sim, clock=clock)
+    drone.closed_loop = closed_loop
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = out or os.path.join(tmp, "replay.rec")
+        drone.takeoff().result()
+        drone.record(log)
+        start = time.monotonic()
+        drone.play(schedule).result()
+        wall = time.monotonic() - start
+        drone.shutdown()
+        replayed = np.array(recorder.load(log))  # copied,the temporary file is going away
+
+    flight = trajectory.duration(schedule) / 1000
+    return {
+        "replay": replayed,
+        "ticks": len(schedule),
+        "flight_s": flight,
+        "wall_s": wall,
+        "speedup": flight / wall if wall else float("inf"),
+        "velocity_error": velocity_error(original, replayed),
+        "position": sim.position,
+        "compilation": check_compilation(path) if isinstance(path, str) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("logs", nargs="+", help="flight logs written by DroneCore.record")
+    parser.add_argument("--speed", type=float, default=None, help="times real time,as fast as possible if omitted")
+    parser.add_argument("--closed-loop", action="store_true", help="correct the speed from navdata")
+    parser.add_argument("--tau", type=float, default=200, help="lag of the simulated drone,in ms")
+    args = parser.parse_args()
+
+    for path in args.logs:
+        r = replay(path, args.speed, args.closed_loop, tau=args.tau)
+        print("%-24s %6d ticks  %7.1fs flight in %6.2fs(x%.0f)  velocity error %7.1fmm/s  ends at x:%.2fm y:%.2fm z:%.2fm"
+              % (os.path.basename(path), r["ticks"], r["flight_s"], r["wall_s"], r["speedup"],
+                 r["velocity_error"], *r["position"]))
+        compilation = r["compilation"]
+        if compilation is None:
+            print("%-24s no moves recorded,compilation not checked" % "")
+            continue
+        print("%-24s %d moves compiled again,%d skipped,%d mismatches"
+              % ("", compilation["moves"], compilation["skipped"], len(compilation["mismatches"])))
+        for label, tick, error in compilation["mismatches"]:
+            print("%-24s   %s from record %d differs by %.4f" % ("", label, tick, error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+The control loop of MyDrone.
+
+It runs in a thread of its own and sends compiled schedules(see trajectory.py) to UAV.
+Every row is sent at its absolute deadline 'start + t' on the clock(monotonic by default,see clock.py),
+so a late tick never delays the following ones and a 1000ms move does last 1000ms.
+
+Besides the queue of jobs,schedules may be laid over whatever is flying(see ControlLoop.overlay).
+Every layer keeps its own place,and each tick sends the sum of the job row and the rows of the layers,
+clamped to [-1, 1],as one command. When only layers are left the loop hovers underneath them.
+"""
+import threading
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+
+import trajectory
+from clock import MonotonicClock
+
+
+class Job:
+    """A schedule waiting in the control loop"""
+    __slots__ = ("schedule", "on_done", "label", "params")
+
+    def __init__(self, schedule, on_done=None, label=None, params=None):
+        self.schedule = schedule
+        self.on_done = on_done
+        self.label = label  # what the job is,e.g. "free_move",for the metrics
+        self.params = params  # what 'label' was called with,for the flight log(see DroneCore.record)
+
+
+def _done(job, finished):
+    """Call on_done of a job or a layer,an exception there is printed and doesn't stop the loop"""
+    if job.on_done is None:
+        return
+    try:
+        job.on_done(finished)
+    except Exception:
+        traceback.print_exc()
+
+
+class Layer:
+    """A schedule laid over the jobs,it starts on the first tick after it is added"""
+    __slots__ = ("schedule", "on_done", "label", "params", "start", "index", "length")
+
+    def __init__(self, schedule, on_done=None, label=None, step=trajectory.STEP, params=None):
+        self.schedule = schedule
+        self.on_done = on_done
+        self.label = label
+        self.params = params
+        self.start = None  # deadline of its first tick
+        self.index = 0  # the row in effect
+        self.length = trajectory.duration(schedule) + step  # ms,the last row holds for one step
+
+
+class ControlLoop(threading.Thread):
+    """
+    Jobs are played one after another in the order they are submitted.
+    When a job is queued right behind another,it starts one step after the last deadline of the previous one
+    instead of 'now',so back-to-back jobs don't drift either.
+
+    Notes:
+    * 'send' is called in this thread with a row (t, vx, vy, vz, w),
+      tick_time and tick_lateness(ms) tell when it is called
+    * 'on_done' is called in this thread with True if the job finished,False if it was cancelled
+      or 'send' raised,exceptions of both are printed and the loop goes on
+    """
+    def __init__(self, send, step=trajectory.STEP, clock=None, history=1000):
+        super().__init__(daemon=True)
+        self.send = send
+        self.step = step
+        self.clock = clock or MonotonicClock()
+
+        self.jobs = deque()
+        self.job = None
+        self.job_start = None  # deadline of the first row of the current job
+        self.layers = []  # replaced rather than changed,so the loop reads it without the lock
+        self._carrying = None  # the hover job under the layers,see _carrier
+        self.closed = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+
+        # Timing report
+        self.history = history
+        self.reset_stats()
+
+    # Interface for other threads
+# ------------------------------------------------------
+    def submit(self, schedule, on_done=None, label=None, params=None):
+        """Queue a schedule,it is thread-safe"""
+        with self._cond:
+            self.jobs.append(Job(schedule, on_done, label, params))
+            self._cond.notify()
+
+    def overlay(self, schedule, on_done=None, label=None, params=None):
+        """
+        Lay a schedule over what is flying from the next tick on,instead of queuing it,it is thread-safe
+        'on_done' is called in this thread like the one of a job
+        """
+        with self._cond:
+            self.layers = self.layers + [Layer(schedule, on_done, label, self.step, params)]
+            self._cond.notify()
+
+    def cancel(self):
+        """Stop the current job and the layers immediately and drop all the queued jobs"""
+        with self._cond:
+            dropped = list(self.jobs) + self.layers
+            self.jobs.clear()
+            self.layers = []
+            self._cancelled = True
+            self._cond.notify()
+        for job in dropped:
+            _done(job, False)
+
+    def close(self):
+        self.cancel()
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    @property
+    def busy(self):
+        carrying = self.job is not None and self.job is self._carrying  # hovering under layers is no work
+        return (self.job is not None and not carrying) or bool(self.jobs) or bool(self.layers)
+
+    def reset_stats(self):
+        self.lateness = deque(maxlen=self.history)  # ms, lateness of the latest ticks
+        self.cpu = deque(maxlen=self.history)  # ms, CPU time this thread spent on the latest ticks
+        self.ticks = 0
+        self.skipped = 0  # rows dropped because their deadline had already passed
+        self.errors = 0  # ticks whose send raised
+        self.tick_time = 0.0
+        self.tick_lateness = 0.0
+
+    def stats(self):
+        """A summary of the lateness and CPU time of the latest ticks,in millisecond"""
+        late = np.fromiter(self.lateness, dtype=float)
+        cpu = np.fromiter(self.cpu, dtype=float)
+        return {
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "mean_lateness": float(late.mean()) if len(late) else 0.0,
+            "max_lateness": float(late.max()) if len(late) else 0.0,
+            "p99_lateness": float(np.percentile(late, 99)) if len(late) else 0.0,
+            "mean_cpu": float(cpu.mean()) if len(cpu) else 0.0,
+            "max_cpu": float(cpu.max()) if len(cpu) else 0.0,
+        }
+
+    # The loop itself
+# ------------------------------------------------------
+    def run(self):
+        start = None
+        while True:
+            with self._cond:
+                while not self.jobs and not self.layers and not self.closed:
+                    start = None  # Idle,the next job will start right away
+                    self._cond.wait()
+                # Otherwise it is queued behind the previous job and starts right after its last deadline
+                if self.closed:
+                    return
+                self.job = self.jobs.popleft() if self.jobs else self._carrier()
+                self._cancelled = False
+
+            now = self.clock.now()
+            if start is None or start < now - self.step / 1000:
+                start = now
+            self.job_start = start
+            finished = self._play(self.job, start)
+            start = self._last_deadline + self.step / 1000 if finished else None
+
+            job, self.job = self.job, None
+            _done(job, finished)
+
+    def _hover(self, row):
+        """Try not to leave UAV on the command before a failed tick"""
+        hover = np.zeros_like(row)
+        hover[trajectory.T] = row[trajectory.T]
+        try:
+            self.send(hover)
+        except Exception:
+            pass  # the send path itself is broken,nothing more to do here
+
+    def _carrier(self):
+        """A hover job for the layers to be laid over when no job is queued,long enough for all of them"""
+        now = self.clock.now()
+        left = max(layer.length - (0 if layer.start is None else (now - layer.start) * 1000)
+                   for layer in self.layers)
+        self._carrying = Job(trajectory.hover(max(left, self.step), self.step), None, "layers")
+        return self._carrying
+
+    def _mix(self, row, deadline):
+        """The row plus the rows of the layers in effect at 'deadline',clamped"""
+        row = row.copy()
+        ended = []
+        for layer in self.layers:
+            if layer.start is None:
+                layer.start = deadline
+            elapsed = (deadline - layer.start) * 1000 + 1e-6
+            if elapsed >= layer.length:
+                ended.append(layer)
+                continue
+            sch = layer.schedule
+            t = sch[:, trajectory.T]
+            while layer.index + 1 < len(sch) and t[layer.index + 1] - t[0] <= elapsed:
+                layer.index += 1
+            row[trajectory.VX:] += sch[layer.index, trajectory.VX:]
+        np.clip(row[trajectory.VX:], -1, 1, out=row[trajectory.VX:])
+        if ended:
+            with self._cond:
+                # cancel() may have dropped them meanwhile,and called their on_done already
+                ended = [layer for layer in ended if layer in self.layers]
+                self.layers = [layer for layer in self.layers if layer not in ended]
+            for layer in ended:
+                _done(layer, True)
+        return row
+
+    def _play(self, job, start):
+        """Send every row at its deadline,return False if cancelled"""
+        sch = job.schedule
+        deadlines = start + (sch[:, trajectory.T] - sch[0, trajectory.T]) / 1000
+        carrier = job is self._carrying
+        n = len(sch)
+        i = 0
+        while i < n:
+            with self._cond:
+                if carrier and i and (self.jobs or not self.layers):
+                    n = i  # A job came or the layers ended,the carrier gives way at once
+                    break
+                delay = deadlines[i] - self.clock.now()
+                while delay > 0 and not self._cancelled:
+                    self.clock.wait(self._cond, delay)
+                    delay = deadlines[i] - self.clock.now()
+                if self._cancelled:
+                    return False
+
+            cpu = time.thread_time()
+            now = self.clock.now()
+            # More than one step late,jump to the row which should be sent now
+            if i + 1 < n and now >= deadlines[i + 1]:
+                j = int(np.searchsorted(deadlines, now, side="right")) - 1
+                self.skipped += j - i
+                i = j
+
+            self.tick_time = now
+            self.tick_lateness = (now - deadlines[i]) * 1000
+            try:
+                self.send(self._mix(sch[i], deadlines[i]) if self.layers else sch[i])
+            except Exception:
+                # The job fails,the loop goes on with the next one
+                traceback.print_exc()
+                self.errors += 1
+                self._hover(sch[i])
+                return False
+            self.lateness.append(self.tick_lateness)
+            self.cpu.append((time.thread_time() - cpu) * 1000)
+            self.ticks += 1
+            i += 1
+        self._last_deadline = deadlines[n - 1]
+        return True
@@ -0,0 +1,190 @@
+"""
+A simulated ARDrone for flying without hardware.
+
+SimDrone accepts the same calls DroneCore makes on pyardrone.ARDrone(move, hover, takeoff, land, send, close)
+and exposes state.fly_mask and navdata.demo,so every shape runs through the production code:
+    drone = DroneCore(link=SimDrone())
+
+Dynamics:
+the velocity follows the command with a first-order lag of 'tau' ms,
+a command of 1 means max_v(m/ms) horizontally,max_v/vertical_gain vertically and max_w(deg/ms) in yaw.
+(MyDrone multiplies vertical commands by 4 because UAV climbs about 4 times slower than it flies)
+Commands are in the body frame(forward/right follow the heading),position is in the world frame.
+"""
+import random
+import threading
+from math import cos, sin, exp, radians
+from types import SimpleNamespace
+
+from clock import MonotonicClock
+
+
+class SimState:
+    """The few bits of pyardrone's DroneState we need"""
+    def __init__(self, fly_mask):
+        self.fly_mask = fly_mask
+
+
+class SimNavdataClient:
+    """
+    Stands for pyardrone's NavDataClient when SimDrone sends packets:
+    navdata_received is called with a real navdata packet(see telemetry.encode) after every command
+    """
+    def __init__(self):
+        self.data = None
+
+    def navdata_received(self, data):
+        self.data = data  # pyardrone would decode it here,SimDrone.navdata is computed on demand anyway
+
+
+class SimDrone:
+    """
+    :param packets: Whether to send navdata packets to navdata_client like the real drone,
+                    so that DroneCore.subscribe works,it needs pyardrone to build them
+
+    Notes:
+    * Position x points right,y forward,z up of the heading at takeoff,in meter
+    * navdata.demo.vx/vy/vz are the body velocities forward/right/up in mm/s
+    """
+    def __init__(self, max_v=0.01, max_w=0.12, vertical_gain=4, tau=200, takeoff_ms=500,
+                 noise=0.0, clock=None, verbose=False, seed=None, packets=False):
+        self.max_v = max_v
+        self.max_w = max_w
+        self.vertical_gain = vertical_gain
+        self.tau = tau
+        self.takeoff_ms = takeoff_ms
+        self.noise = noise  # std of navdata velocity,in mm/s
+        self.clock = clock or MonotonicClock()
+        self.verbose = verbose
+        self._random = random.Random(seed)
+
+        self.pos = [0.0, 0.0, 0.0]  # x, y, z in m
+        self.yaw = 0.0  # deg,clockwise
+        self.vel = [0.0, 0.0, 0.0, 0.0]  # right, forward, up in m/ms and yaw rate in deg/ms,in body frame
+        self.cmd = [0.0, 0.0, 0.0, 0.0]  # the same axes,in percentage
+
+        self.flying = False
+        self.takeoff_at = None  # ms,when the pending takeoff completes
+        self.commands = 0  # AT commands received
+        self.trace = []  # (t in ms, x, y, z, yaw),one point per command
+
+        self._t = self.clock.now() * 1000
+        self.closed = False
+        self._lock = threading.RLock()  # commands come from the control loop while others read the state
+        self.navdata_client = SimNavdataClient() if packets else None
+        self.sequence = 0
+
+    # Dynamics
+# ------------------------------------------------------
+    def _target(self):
+        rx, fy, uz, w = self.cmd
+        return [rx * self.max_v, fy * self.max_v, uz * self.max_v / self.vertical_gain, w * self.max_w]
+
+    def update(self):
+        """Integrate the model up to now"""
+        with self._lock:
+            self._update()
+
+    def _update(self):
+        now = self.clock.now() * 1000
+        dt = now - self._t
+        self._t = now
+        if self.takeoff_at is not None and now >= self.takeoff_at:
+            self.takeoff_at = None
+            self.flying = True
+        if dt <= 0:
+            return
+        if not self.flying:
+            self.vel = [0.0, 0.0, 0.0, 0.0]
+            return
+
+        # Exact solution of v' = (target - v)/tau for a constant target
+        k = exp(-dt / self.tau)
+        target = self._target()
+        moved = [tv * dt + (v - tv) * self.tau * (1 - k) for v, tv in zip(self.vel, target)]
+        self.vel = [tv + (v - tv) * k for v, tv in zip(self.vel, target)]
+
+        heading = radians(self.yaw + moved[3] / 2)
+        dx, dy, dz = moved[0], moved[1], moved[2]
+        self.pos[0] += dx * cos(heading) + dy * sin(heading)
+        self.pos[1] += -dx * sin(heading) + dy * cos(heading)
+        self.pos[2] = max(self.pos[2] + dz, 0.0)
+        self.yaw += moved[3]
+
+    def _command(self, cmd):
+        with self._lock:
+            self._update()
+            self.cmd = cmd
+            self.commands += 1
+            self.trace.append((self._t, self.pos[0], self.pos[1], self.pos[2], self.yaw))
+        if self.verbose:
+            print("t:%dms\tvx:%.3f\tvy:%.3f\tvz:%.3f\tw:%.3f" % (self._t, *cmd))
+        self._send_navdata()
+
+    def _send_navdata(self):
+        if self.navdata_client is None:
+            return
+        from telemetry import encode
+        navdata = self.navdata
+        self.sequence += 1
+        demo = {name: getattr(navdata.demo, name) for name in ("vx", "vy", "vz", "psi", "altitude")}
+        self.navdata_client.navdata_received(encode(navdata.metadata.state, self.sequence, {"demo": demo}))
+
+    # The interface of pyardrone.ARDrone
+# ------------------------------------------------------
+    def move(self, *, forward=0, backward=0, left=0, right=0, up=0, down=0, cw=0, ccw=0):
+        self._command([float(right - left), float(forward - backward), float(up - down), float(cw - ccw)])
+
+    def hover(self):
+        self._command([0.0, 0.0, 0.0, 0.0])
+
+    def takeoff(self):
+        with self._lock:
+            self._update()
+            self.commands += 1
+            if not self.flying and self.takeoff_at is None:
+                self.takeoff_at = self._t + self.takeoff_ms
+        self._send_navdata()
+
+    def land(self):
+        with self._lock:
+            self._update()
+            self.commands += 1
+            self.takeoff_at = None
+            self.flying = False
+            self.cmd = [0.0, 0.0, 0.0, 0.0]
+            self.pos[2] = 0.0
+        self._send_navdata()
+
+    def send(self, command):
+        self.commands += 1
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def state(self):
+        self.update()
+        return SimState(self.flying)
+
+    @property
+    def navdata(self):
+        with self._lock:
+            self._update()
+            rx, fy, uz, _ = self.vel
+            yaw, z, flying = self.yaw, self.pos[2], self.flying
+        n = self._random.gauss if self.noise else (lambda mu, sigma: mu)
+        demo = SimpleNamespace(
+            vx=n(fy * 1e6, self.noise),  # m/ms to mm/s
+            vy=n(rx * 1e6, self.noise),
+            vz=n(uz * 1e6, self.noise),
+            psi=yaw * 1000,  # milli-degree
+            altitude=int(z * 100),  # cm
+        )
+        return SimpleNamespace(demo=demo, metadata=SimpleNamespace(state=int(flying)))
+
+    @property
+    def position(self):
+        with self._lock:
+            self._update()
+            return tuple(self.pos)
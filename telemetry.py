@@ -0,0 +1,241 @@
+"""
+Navdata by subscription: only the fields asked for are read out of each packet.
+
+pyardrone decodes every option block of every packet into ctypes objects,while the control needs a few numbers.
+Here a consumer subscribes to fields such as "demo.vx" or "state",and each packet is walked over a memoryview:
+the option headers are skipped through,and the subscribed fields of a block are unpacked by one precompiled
+struct at the offsets of pyardrone's layouts(see pyardrone.navdata.options). Nothing else is decoded.
+
+The values go into a ring buffer preallocated for 'capacity' packets,one row (time, sequence, state, fields...)
+per packet. The navdata thread is the only writer and publishes a row by counting it after writing it,
+so the control loop reads the latest one without lock:
+
+    telemetry = Telemetry()
+    speed = telemetry.subscribe("demo.vx", "demo.vy")
+    client.navdata_received = lambda data: telemetry.feed(data, time.monotonic())
+    ...
+    if speed.read():
+        vx, vy = speed.values
+    speed.navdata.demo.vx  # the same,the way pyardrone's NavData reads
+"""
+import ctypes
+import struct
+
+import numpy as np
+
+NAVDATA_HEADER = 0x55667788
+CHECKSUM_TAG = 0xFFFF
+
+_METADATA = struct.Struct("<IIII")  # header,state,sequence number,vision flag
+_OPTION = struct.Struct("<HH")  # tag,size
+_CHECKSUM = struct.Struct("<HHI")
+
+TIME, SEQUENCE, STATE = range(3)  # the columns of every row,the fields follow
+_COLUMNS = {"time": TIME, "sequence": SEQUENCE, "state": STATE}
+
+
+def layout(name):
+    """
+    (tag, offset, struct code) of 'option.field',e.g. "demo.vx" -> (0, 28, 'f')
+    Only numbers are supported,not the arrays of some blocks
+    """
+    from pyardrone.navdata.options import index  # needs pyardrone,only when subscribing to a real block
+    option, _, field = name.partition(".")
+    for tag, cls in index.items():
+        if cls._attrname == option:
+            break
+    else:
+        raise KeyError("no navdata option %r" % option)
+    ctype = dict(f for klass in reversed(cls.__mro__) for f in getattr(klass, "_fields_", [])).get(field)
+    if ctype is None:
+        raise KeyError("no field %r in navdata option %r" % (field, option))
+    code = getattr(ctype, "_type_", None)
+    if not isinstance(code, str):
+        raise ValueError("%s is not a number" % name)
+    return tag, getattr(cls, field).offset, code
+
+
+def _parser(fields):
+    """One struct reading all the fields of an option block,[(offset, code, column)] -> (Struct, columns)"""
+    fmt = "<"
+    end = 0
+    for offset, code, _ in sorted(fields):
+        fmt += "%dx%s" % (offset - end, code) if offset > end else code
+        end = offset + struct.calcsize("<" + code)
+    return struct.Struct(fmt), [column for _, _, column in sorted(fields)]
+
+
+class Telemetry:
+    """
+    :param capacity: Packets kept in the ring buffer
+    :param verify: Whether to check the checksum of every packet,a packet failing it is not stored
+    """
+    def __init__(self, capacity=64, verify=False):
+        self.capacity = capacity
+        self.verify = verify
+        self.fields = []  # subscribed 'option.field',column 3 onwards
+        self._layouts = {}  # field -> (tag, offset, code)
+        self.count = 0  # packets stored,the latest is in row (count - 1) % capacity
+        self.errors = 0  # packets too short,of a wrong header or checksum
+        # (parsers by tag,ring buffer) are swapped together when fields are added
+        self._plan = ({}, np.full((capacity, len(_COLUMNS)), np.nan))
+
+    def subscribe(self, *fields):
+        """
+        Read these fields from every packet from now on,besides "time","sequence" and "state"
+        Subscribe before flying: adding fields allocates a new ring buffer
+        :return: A Subscription to read them
+        """
+        new = [f for f in fields if f not in _COLUMNS and f not in self.fields]
+        if new:
+            self._layouts.update({f: layout(f) for f in new})  # raises before anything is changed
+            self.fields += new
+            by_tag = {}
+            for i, name in enumerate(self.fields):
+                tag, offset, code = self._layouts[name]
+                by_tag.setdefault(tag, []).append((offset, code, len(_COLUMNS) + i))
+            rows = self._plan[1]
+            grown = np.full((self.capacity, len(_COLUMNS) + len(self.fields)), np.nan)
+            grown[:, :rows.shape[1]] = rows
+            self._plan = ({tag: _parser(f) for tag, f in by_tag.items()}, grown)
+        return Subscription(self, fields)
+
+    def feed(self, data, now):
+        """
+        Called by the navdata thread with every packet
+        :param now: Second,when it was received
+        :return: False if the packet is rejected
+        """
+        parsers, rows = self._plan
+        buf = memoryview(data)
+        size = len(buf)
+        if size < _METADATA.size:
+            self.errors += 1
+            return False
+        header, state, sequence, _ = _METADATA.unpack_from(buf)
+        if header != NAVDATA_HEADER:
+            self.errors += 1
+            return False
+
+        row = rows[self.count % self.capacity]
+        row[len(_COLUMNS):] = np.nan  # blocks missing from this packet
+        row[TIME] = now
+        row[SEQUENCE] = sequence
+        row[STATE] = state
+        offset = _METADATA.size
+        while offset + _OPTION.size <= size:
+            tag, length = _OPTION.unpack_from(buf, offset)
+            if not length or offset + length > size:
+                break
+            if tag == CHECKSUM_TAG:
+                if self.verify and _CHECKSUM.unpack_from(buf, offset)[2] != sum(buf[:offset]) & 0xffffffff:
+                    self.errors += 1
+                    return False
+                break
+            parser = parsers.get(tag)
+            if parser is not None:
+                row[parser[1]] = parser[0].unpack_from(buf, offset)
+            offset += length
+        self.count += 1  # Published,readers may take this row from now on
+        return True
+
+    def latest(self, out):
+        """
+        Copy the latest row into 'out',it is lock-free
+        :return: False if no packet has been stored
+        """
+        rows = self._plan[1]
+        while True:
+            count = self.count
+            if not count:
+                return False
+            np.copyto(out, rows[(count - 1) % self.capacity, :len(out)])
+            # The writer only gets to that row again capacity-1 packets later
+            if self.count - count < self.capacity - 1:
+                return True
+
+    def history(self, n=None):
+        """The latest n rows,oldest first,copied"""
+        rows = self._plan[1]
+        count = self.count
+        n = min(n or self.capacity, count, self.capacity - 1)
+        return rows[np.arange(count - n, count) % self.capacity].copy()
+
+
+class Subscription:
+    """
+    The fields one consumer reads,from the Telemetry it subscribed to
+    read() copies the latest packet into 'row',a buffer of its own,'values' and 'navdata' look at that copy
+    """
+    def __init__(self, telemetry, fields):
+        self.telemetry = telemetry
+        self.fields = list(fields)
+        self.columns = [_COLUMNS[f] if f in _COLUMNS else len(_COLUMNS) + telemetry.fields.index(f)
+                        for f in fields]
+        self.row = np.full(len(_COLUMNS) + len(telemetry.fields), np.nan)
+        self.navdata = _View(self)
+
+    def read(self):
+        """Take the latest packet,False if none yet"""
+        return self.telemetry.latest(self.row)
+
+    @property
+    def values(self):
+        return self.row[self.columns]
+
+    @property
+    def time(self):
+        return self.row[TIME]
+
+    def __getitem__(self, field):
+        return self.row[self.columns[self.fields.index(field)]]
+
+
+class _View:
+    """navdata.demo.vx and navdata.metadata.state read from the row of a subscription,like pyardrone's NavData"""
+    def __init__(self, sub):
+        options = {}
+        for field, column in zip(sub.fields, sub.columns):
+            option, _, name = field.partition(".")
+            if name:
+                options.setdefault(option, {})[name] = column
+        options.setdefault("metadata", {}).update(state=STATE, sequence_number=SEQUENCE)
+        for option, columns in options.items():
+            setattr(self, option, _Option(sub.row, columns))
+
+
+class _Option:
+    __slots__ = ("_row", "_columns")
+
+    def __init__(self, row, columns):
+        self._row = row
+        self._columns = columns
+
+    def __getattr__(self, name):
+        try:
+            value = self._row[self._columns[name]]
+        except KeyError:
+            raise AttributeError("%s is not subscribed" % name) from None
+        if value != value:
+            raise AttributeError("%s is missing from the latest packet" % name)  # NaN
+        return float(value) if name not in ("state", "sequence_number") else int(value)
+
+
+def encode(state, sequence, options):
+    """
+    A navdata packet as the drone sends it,with a checksum,e.g. for sim.SimDrone
+    :param options: {option: {field: value}},e.g. {"demo": {"vx": 100.0}},other fields are 0
+    """
+    from pyardrone.navdata.options import index
+    parts = [_METADATA.pack(NAVDATA_HEADER, state, sequence, 0)]
+    for option, values in options.items():
+        tag = next(t for t, cls in index.items() if cls._attrname == option)
+        block = bytearray(ctypes.sizeof(index[tag]))
+        _OPTION.pack_into(block, 0, tag, len(block))
+        for field, value in values.items():
+            _, offset, code = layout("%s.%s" % (option, field))
+            struct.pack_into("<" + code, block, offset, value)
+        parts.append(bytes(block))
+    body = b"".join(parts)
+    return body + _CHECKSUM.pack(CHECKSUM_TAG, _CHECKSUM.size, sum(body) & 0xffffffff)
+
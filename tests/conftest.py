@@ -0,0 +1,24 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# The modules of MyDrone live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ATClient:
+    """Stands for pyardrone's ATClient,keeping the datagrams instead of sending them"""
+    def __init__(self):
+        self.sequence_number_mutex = threading.Lock()
+        self.sequence_number = 0
+        self.datagrams = []
+
+    def send_bytes(self, packet, log=True):
+        self.datagrams.append(packet)
+
+
+@pytest.fixture
+def at_client():
+    return ATClient()
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from cache import ScheduleCache
+
+
+class Compiler:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return np.arange(10.0).reshape(2, 5)
+
+
+def test_memory_and_restart_hits(tmp_path):
+    compile = Compiler()
+    cache = ScheduleCache(directory=str(tmp_path))
+    first = cache.get("circle", {"r": 0.6}, compile, (0.01,))
+    np.testing.assert_array_equal(cache.get("circle", {"r": 0.6}, compile, (0.01,)), first)
+    assert (compile.calls, cache.hits, cache.misses) == (1, 1, 1)
+
+    restarted = ScheduleCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(restarted.get("circle", {"r": 0.6}, compile, (0.01,)), first)
+    assert (compile.calls, restarted.disk_hits) == (1, 1)
+    restarted.get("circle", {"r": 0.6}, compile, (0.02,))  # another calibration
+    assert compile.calls == 2
+
+
+def _calibrations(path):
+    return sorted(e for e in os.listdir(path) if os.path.isdir(os.path.join(path, e)))
+
+
+def test_least_recently_used_calibrations_are_evicted(tmp_path):
+    cache = ScheduleCache(directory=str(tmp_path), calibrations=2)
+    dirs = []
+    for calibration in [(1,), (2,)]:
+        cache.get("circle", {}, Compiler(), calibration)
+        dirs.append(cache._calibration)
+        time.sleep(0.01)  # distinct mtimes
+    cache.get("circle", {}, Compiler(), (1,))  # 1 used again,2 is the least recent
+    time.sleep(0.01)
+    cache.get("circle", {}, Compiler(), (3,))
+    assert _calibrations(tmp_path) == sorted([dirs[0], cache._calibration])
+
+
+def test_only_its_own_files_are_deleted(tmp_path):
+    cache = ScheduleCache(directory=str(tmp_path))
+    cache.get("circle", {}, Compiler(), (1,))
+    own = os.path.join(str(tmp_path), cache._calibration)
+    (tmp_path / "notes.txt").write_text("mine")
+    (tmp_path / "0123456789abcdef").mkdir()  # looks like a calibration,holds something else
+    (tmp_path / "0123456789abcdef" / "data.csv").write_text("mine too")
+    cache.get("square", {}, Compiler(), (1,))
+    cache.clear()
+    assert not os.path.exists(own)
+    assert (tmp_path / "notes.txt").read_text() == "mine"
+    assert (tmp_path / "0123456789abcdef" / "data.csv").read_text() == "mine too"
+
+
+def test_get_from_several_threads():
+    cache = ScheduleCache(capacity=2)
+    errors = []
+
+    def use(offset):
+        try:
+            for i in range(2000):
+                cache.get("move", {"i": (i + offset) % 5}, Compiler(), (i // 500,))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=use, args=(k,)) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
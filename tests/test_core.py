@@ -0,0 +1,143 @@
+"""DroneCore flying sim.SimDrone,on a clock sped up so the waits for navdata stay short"""
+from types import SimpleNamespace
+
+import pytest
+
+import trajectory
+from clock import ScaledClock
+from core import DroneCore
+from sim import SimDrone
+
+SPEED = 20
+
+
+def _watch(drone):
+    """Keep (deadline,row) of every command the control loop sends from now on"""
+    loop = drone.loop
+    sent = []
+    send = loop.send
+    loop.send = lambda row: (sent.append((loop.tick_time - loop.tick_lateness / 1000, row.copy())), send(row))
+    return sent
+
+
+@pytest.fixture
+def drone():
+    clock = ScaledClock(SPEED)
+    drone = DroneCore(link=SimDrone(clock=clock, takeoff_ms=200, tau=50), clock=clock)
+    yield drone
+    drone.shutdown()
+
+
+@pytest.fixture
+def flying(drone):
+    assert drone.takeoff(steady=False).result(5)
+    return drone
+
+
+def test_takeoff_and_land(drone):
+    assert drone.takeoff().result(5) is True
+    assert drone.state.fly_mask
+    assert drone.land().result(5) is True
+    assert not drone.state.fly_mask
+
+
+def test_land_aborts_a_pending_takeoff(drone):
+    takeoff = drone.takeoff()
+    assert drone.land().result(5) is True
+    assert takeoff.result(5) is False
+    assert not drone.state.fly_mask
+    assert drone.halt
+
+
+def test_land_cancels_the_moves(flying):
+    move = flying.forward(0.1, 20000)
+    assert flying.land().result(5) is True
+    assert move.result(5) is False
+    assert flying.forward(0.1, 200).result(5) is False  # halted until the next takeoff
+
+
+def test_move_lasts_its_period(flying):
+    start = flying.clock.now()
+    assert flying.forward(0.5, 1000).result(5) is True
+    assert flying.clock.now() - start == pytest.approx(1.0, abs=2 * flying.step / 1000)
+
+
+def test_move_seq_chains_on_the_next_tick(flying):
+    sent = _watch(flying)
+    seq = [lambda: flying.forward(0.5, 500), lambda: flying.right(0.5, 500)]
+    assert flying.move_seq(seq, no_pause=True).result(5) is True
+
+    switch = next(i for i, (_, row) in enumerate(sent) if row[trajectory.VX])
+    assert sent[switch - 1][1][trajectory.VY] == pytest.approx(0.5)
+    assert sent[switch][0] - sent[switch - 1][0] == pytest.approx(flying.step / 1000)
+
+
+def test_together_overlays_moves(flying):
+    sent = _watch(flying)
+    with flying.together():
+        circle = flying.free_move(0.3, 0, 0, 0, 600)
+        turn = flying.turn(0.4, 300)
+    assert circle.result(5) is True and turn.result(5) is True
+    assert any(row[trajectory.VX] == pytest.approx(0.3) and row[trajectory.W] == pytest.approx(0.4)
+               for _, row in sent)
+
+
+def test_move_seq_raises_the_error_of_an_item(flying):
+    seq = [lambda: flying.forward(0.1, 200), lambda: flying.turn(2)]
+    with pytest.raises(AssertionError):
+        flying.move_seq(seq, no_pause=True).result(5)
+
+
+def test_state_before_the_subscription_has_a_packet():
+    clock = ScaledClock(SPEED)
+    sim = SimDrone(clock=clock, takeoff_ms=200, tau=50, packets=True)
+    drone = DroneCore(link=sim, clock=clock)
+    try:
+        drone.subscribe("demo.altitude", decode=False)
+        assert not drone.state.fly_mask  # from the link,no packet yet
+        drone.subscribe("demo.vz")
+        assert drone.decode is False  # kept when not given
+        assert drone.takeoff(steady=False).result(5)
+        assert drone.forward(0.1, 200).result(5)
+        assert drone._nav.read() and drone.state.fly_mask
+    finally:
+        drone.shutdown()
+
+
+class BootstrapSim(SimDrone):
+    """A drone which was never told navdata_demo,its navdata has the state only"""
+    @property
+    def navdata(self):
+        return SimpleNamespace(metadata=super().navdata.metadata)
+
+
+def test_takeoff_without_the_demo_block():
+    clock = ScaledClock(SPEED)
+    drone = DroneCore(link=BootstrapSim(clock=clock, takeoff_ms=200, tau=50), clock=clock)
+    try:
+        assert drone.takeoff().result(5) is True
+    finally:
+        drone.shutdown()
+
+
+def test_real_link_is_told_navdata_demo(at_client):
+    link = SimDrone()
+    link.at_client = at_client
+    drone = DroneCore(link=link)
+    try:
+        assert b'AT*CONFIG=1,"general:navdata_demo","TRUE"\r' in at_client.datagrams
+    finally:
+        drone.shutdown()
+
+
+def test_land_stops_and_lands_in_one_datagram(at_client):
+    link = SimDrone()
+    link.at_client = at_client
+    drone = DroneCore(link=link)
+    try:
+        assert drone.land().result(5)
+        hover_and_land = [d for d in at_client.datagrams if b"AT*PCMD" in d and b"AT*REF" in d]
+        assert len(hover_and_land) == 1
+        assert hover_and_land[0].index(b"AT*PCMD") < hover_and_land[0].index(b"AT*REF")
+    finally:
+        drone.shutdown()
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+import curve
+import trajectory
+from trajectory import VX, VZ
+
+POINTS = [(0, 0, 0), (0, 1, 0), (1, 1, 0.5), (1, 0, 0.2)]
+
+
+@pytest.mark.parametrize("vertical_gain", [4, 2])
+def test_waypoints_reach_the_last_point(vertical_gain):
+    sch = curve.waypoints(POINTS, v=0.3, accel=1.0, vertical_gain=vertical_gain)
+    end = trajectory.path(sch, vertical_gain=vertical_gain)[-1]
+    np.testing.assert_allclose(end, POINTS[-1], atol=0.02)
+
+
+def test_waypoints_respect_the_speed_of_every_axis():
+    sch = curve.waypoints(POINTS, v=0.3, accel=1.0)
+    assert np.abs(sch[:, VX:VZ + 1]).max() <= 0.3 + 1e-9
+    assert np.abs(sch[0, VX:]).max() < 0.05 and not sch[-1, VX:].any()  # from rest to rest
+
+
+def test_parametric_curve_keeps_its_timing_when_slow_enough():
+    sch = curve.curve(lambda t: 0.2 * t, lambda t: 0 * t, lambda t: 0 * t, 2000, v=1.0)
+    assert trajectory.duration(sch) == pytest.approx(2000, abs=trajectory.STEP)
+    np.testing.assert_allclose(trajectory.path(sch)[-1], (0.4, 0, 0), atol=0.02)
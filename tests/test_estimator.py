@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from clock import ScaledClock
+from core import DroneCore
+from estimator import RLS
+from sim import SimDrone
+
+
+def test_rls_converges_and_follows():
+    rls = RLS()
+    noise = random.Random(1)
+    for _ in range(200):
+        x = noise.uniform(0.1, 1)
+        rls.update(x, 2 * x + noise.gauss(0, 0.01))
+    assert rls.gain == pytest.approx(2, rel=0.01)
+    for _ in range(2000):  # the battery runs down
+        x = noise.uniform(0.1, 1)
+        rls.update(x, 1.5 * x)
+    assert rls.gain == pytest.approx(1.5, rel=0.01)
+
+
+def test_speed_model_is_estimated_in_flight():
+    clock = ScaledClock(20)
+    sim = SimDrone(max_v=0.008, max_w=0.1, vertical_gain=3, clock=clock, takeoff_ms=200, tau=50)
+    drone = DroneCore(link=sim, clock=clock)
+    try:
+        drone.estimate()
+        assert drone.takeoff(steady=False).result(5)
+        for move in (drone.forward, drone.right, drone.climb, drone.turn):
+            assert move(0.5, 2000).result(5)
+        assert drone.model.max_v == pytest.approx(0.008, rel=0.03)
+        assert drone.model.max_w == pytest.approx(0.1, rel=0.03)
+        assert drone.model.vertical_gain(drone.model.max_v) == pytest.approx(3, rel=0.05)
+        assert drone.max_v == pytest.approx(0.008, rel=0.03)  # refined between moves
+        assert drone.vertical_gain == pytest.approx(3, rel=0.05)
+    finally:
+        drone.shutdown()
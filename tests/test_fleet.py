@@ -0,0 +1,46 @@
+"""Fleets of SimDrone on one sped-up clock"""
+import numpy as np
+import pytest
+
+import trajectory
+from clock import ScaledClock
+from fleet import Fleet, merge
+
+
+@pytest.fixture
+def fleet():
+    fleet = Fleet.simulated(3, clock=ScaledClock(20), takeoff_ms=200, tau=50)
+    yield fleet
+    fleet.shutdown()
+
+
+def test_merge_holds_and_delays():
+    a = trajectory.line(0.5, 0, 0, 0, 100, 50)
+    b = trajectory.line(0, 0.5, 0, 0, 100, 50)
+    fleet = merge([a, b], delays=[0, 100], step=50)
+    np.testing.assert_array_equal(fleet[:, trajectory.T], [0, 50, 100, 150, 200, 250])
+    np.testing.assert_array_equal(fleet[:, 1], [0.5, 0.5, 0.5, 0, 0, 0])
+    np.testing.assert_array_equal(fleet[:, 6], [0, 0, 0.5, 0.5, 0.5, 0])
+
+
+def test_takeoff_formation_land(fleet):
+    assert fleet.takeoff(steady=False).result(5) is True
+    assert all(link.flying for link in fleet.links)
+
+    starts = [np.array(link.position) for link in fleet.links]
+    assert fleet.formation("square", v=0.2, ms_period=300, pause=0).result(10) is True
+    moved = [np.array(link.position) - start for link, start in zip(fleet.links, starts)]
+    for other in moved[1:]:
+        np.testing.assert_allclose(other, moved[0], atol=0.01)  # the same shape at the same time
+    assert fleet.stats()["suppressed"] > 0  # the sides are constant
+
+    assert fleet.land().result(5) is True
+    assert not any(link.flying for link in fleet.links)
+    assert fleet.formation("square").result(1) is False  # halted until the next takeoff
+
+
+def test_land_stops_a_formation(fleet):
+    assert fleet.takeoff(steady=False).result(5)
+    flying = fleet.formation("circle")
+    assert fleet.land().result(5) is True
+    assert flying.result(1) is False
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+import mission
+from fly import Item
+
+MISSIONS = os.path.join(os.path.dirname(__file__), "..", "missions")
+
+
+def test_items_are_checked_before_taking_off():
+    Item("circle:r=0.8,vertical=true").check()
+    Item(os.path.join(MISSIONS, "square.jsonl")).check()
+    with pytest.raises(TypeError):
+        Item("circle:foo=1").check()
+    with pytest.raises(ValueError):
+        Item("loop").check()
+
+
+def test_bad_mission_file(tmp_path):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"mission": "bad", "pause": "abc"}\n')
+    with pytest.raises(mission.MissionError):
+        Item(str(path)).check()
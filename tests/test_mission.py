@@ -0,0 +1,67 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import mission
+import trajectory
+
+VERTICAL = ['{"mission": "vertical"}',
+            '{"type": "arc", "v": 0.1, "r": 0.6, "deg": -180, "vertical": true}',
+            '{"type": "waypoints", "points": [[0, 0, 0.5]], "v": 0.2}']
+
+
+def test_vertical_segments_follow_the_calibration():
+    header, segments = mission.read(VERTICAL)
+    segments = list(segments)
+    for seg in segments:
+        default = mission.compile_segment(seg)
+        calibrated = mission.compile_segment(seg, vertical_gain=2)
+        assert not np.array_equal(default, calibrated)
+        # The same path whatever the gain,UAV climbing faster
+        end = trajectory.path(default)[-1]
+        np.testing.assert_allclose(trajectory.path(calibrated, vertical_gain=2)[-1], end, atol=0.02)
+
+    compiled = list(mission.schedules(header, segments, vertical_gain=2))
+    np.testing.assert_array_equal(compiled[0], mission.compile_segment(segments[0], vertical_gain=2))
+
+
+ESCAPE = ("[m.load_module('os').getpid() for m in [s for s in [y.__class__.__base__.__subclasses__() for y in [t]][0]"
+          " if s.__name__=='BuiltinImporter']][0]")
+
+
+@pytest.mark.parametrize("text", [ESCAPE, "t.__class__", "(lambda: 1)()", "[t][0]", "FUNCTIONS", "exp(t, out=t)",
+                                  "pi(t)", "'a' * 3", "__import__('os')"])
+def test_expression_rejects_anything_but_arithmetic(text):
+    with pytest.raises(mission.MissionError):
+        mission.segment({"type": "function", "vx": text, "ms_period": 1000})
+
+
+def test_expression_of_t():
+    seg = mission.segment({"type": "function", "vx": "0.1*cos(pi*t) if t < 1 else -abs(t - 2)", "ms_period": 2000})
+    assert seg["vx"](0.0) == pytest.approx(0.1)
+    assert seg["vx"](1.5) == pytest.approx(-0.5)
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "missions", "*.jsonl"))):
+        mission.compile_mission(path)
+
+
+@pytest.mark.parametrize("lines", [
+    ['{"mission": "m", "pause": "abc"}'],
+    ['{"mission": "m", "pause": -1}'],
+    ['{"mission": "m", "speed": 2}'],
+    ['{"type": "arc", "v": 0, "r": 0.6, "deg": 90}'],
+    ['{"type": "arc", "v": 0.1, "r": 0, "deg": 90}'],
+    ['{"type": "line", "vx": 1.5, "ms_period": 1000}'],
+    ['{"type": "turn", "w": -2}'],
+    ['{"type": "hover", "ms_period": -5}'],
+    ['{"type": "waypoints", "points": [[0, 1]]}'],
+    ['{"type": "waypoints", "points": "abc"}'],
+    ['{"type": "waypoints", "points": [[0, 1, 0]], "v": -0.2}'],
+    ['{"type": "function", "vx": "2*cos(t)", "ms_period": 1000}'],
+])
+def test_mission_errors_are_raised_before_flying(lines):
+    with pytest.raises(mission.MissionError):
+        header, segments = mission.read(lines)
+        for seg in segments:
+            mission.compile_segment(seg)
@@ -0,0 +1,51 @@
+import threading
+
+import recorder
+from clock import ScaledClock
+from core import DroneCore
+from recorder import FlightRecorder
+from sim import SimDrone
+
+
+def test_record_after_close_is_ignored(tmp_path):
+    rec = FlightRecorder(str(tmp_path / "flight.rec"))
+    rec.record(0.0, 0.1, 0, 0, 0)
+    rec.close()
+    rec.record(0.05, 0.1, 0, 0, 0)
+    assert len(recorder.load(str(tmp_path / "flight.rec"))) == 1
+
+
+def test_close_while_recording(tmp_path):
+    rec = FlightRecorder(str(tmp_path / "flight.rec"), chunk=64, interval=0.01)
+    stop = threading.Event()
+
+    def hot_path():
+        t = 0.0
+        while not stop.is_set():
+            rec.record(t, 0.1, 0, 0, 0)
+            t += 0.05
+    thread = threading.Thread(target=hot_path)
+    thread.start()
+    while rec.count < 100:
+        pass
+    rec.close()
+    stop.set()
+    thread.join()
+    log = recorder.load(str(tmp_path / "flight.rec"))
+    assert len(log) == rec.count
+
+
+def test_fly_column_follows_the_state(tmp_path):
+    clock = ScaledClock(20)
+    drone = DroneCore(link=SimDrone(clock=clock, takeoff_ms=200, tau=50), clock=clock)
+    path = str(tmp_path / "flight.rec")
+    drone.record(path)
+    try:
+        drone.settle(500).result(5)  # on the ground
+        assert drone.takeoff(steady=False).result(5)
+        assert drone.forward(0.1, 500).result(5)
+    finally:
+        drone.stop_recording()
+        drone.shutdown()
+    fly = recorder.load(path)["fly"]
+    assert fly[0] == 0 and fly[-1] == 1
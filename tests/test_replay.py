@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import recorder
+import replay
+import trajectory
+from clock import ScaledClock
+from core import DroneCore
+from sim import SimDrone
+
+
+def _log(times, vx):
+    rec = np.zeros(len(times), dtype=recorder.RECORD)
+    rec["time"] = times
+    rec["nav_vx"] = vx
+    rec["fly"] = 1
+    return rec
+
+
+def test_velocity_error_aligns_on_deadlines():
+    t = np.arange(0, 2, 0.05)
+    original = _log(t, 1000 * np.sin(t))
+    skipped = np.delete(np.arange(len(t)), [5])  # one tick missing from the replay
+    replayed = _log(t[skipped] + 7, 1000 * np.sin(t[skipped]))  # another clock
+    assert replay.velocity_error(original, replayed) < 5
+
+
+def test_replay_of_a_replay(tmp_path):
+    first = str(tmp_path / "first.rec")
+    t = np.arange(0, 1, 0.05)
+    rec = _log(t, 0)
+    rec["vy"] = 0.3
+    result = replay.replay(rec, out=first)
+    again = replay.replay(first)
+    assert again["velocity_error"] < 1
+    assert result["ticks"] == len(t)
+
+
+@pytest.fixture(scope="module")
+def flight(tmp_path_factory):
+    """A log of a few moves flown on SimDrone,with their moves file"""
+    path = str(tmp_path_factory.mktemp("flight") / "flight.rec")
+    clock = ScaledClock(20)
+    drone = DroneCore(link=SimDrone(clock=clock, takeoff_ms=200, tau=50), clock=clock)
+    try:
+        assert drone.takeoff(steady=False).result(5)
+        drone.record(path)
+        assert drone.square(0.2, 300).result(10)
+        assert drone.arc_move(0.2, 0.3, -90).result(10)
+        assert drone.turn(0.5, 500).result(5)
+        with drone.together():
+            layered = drone.forward(0.2, 600)
+            drone.turn(0.3, 300)
+        assert layered.result(5)
+        assert drone.function_move(lambda t: 0.1, lambda t: 0, lambda t: 0, 300).result(5)
+    finally:
+        drone.shutdown()
+    return path
+
+
+def test_moves_compile_as_recorded(flight):
+    meta, moves = recorder.load_moves(flight)
+    assert meta["max_v"] == 0.01
+    assert [m["label"] for m in moves if not m.get("layer")] == \
+        ["square", "arc_move", "free_move", "layers", "function_move"]
+    assert [m["label"] for m in moves if m.get("layer")] == ["free_move", "free_move"]
+    result = replay.check_compilation(flight)
+    assert result == {"moves": 3, "skipped": 2, "mismatches": []}  # the hover under the layers,function_move
+
+
+def test_regression_in_compiling_is_caught(flight, monkeypatch):
+    square = trajectory.square
+    monkeypatch.setattr(trajectory, "square", lambda v, *args, **kwargs: square(v * 1.1, *args, **kwargs))
+    result = replay.check_compilation(flight)
+    assert [label for label, _, _ in result["mismatches"]] == ["square"]
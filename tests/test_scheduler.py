@@ -0,0 +1,159 @@
+"""The control loop on VirtualClock,so every deadline is met exactly and nothing waits for real"""
+import threading
+
+import numpy as np
+import pytest
+
+import trajectory
+from clock import VirtualClock
+from scheduler import ControlLoop
+
+STEP = trajectory.STEP
+
+
+class Sent:
+    """The send of a ControlLoop,keeping (clock time,row) of every tick"""
+    def __init__(self, clock, fail=None):
+        self.clock = clock
+        self.rows = []
+        self.fail = fail  # called with the tick number,raises to make send fail
+
+    def __call__(self, row):
+        if self.fail is not None:
+            self.fail(len(self.rows))
+        self.rows.append((self.clock.now(), row.copy()))
+
+
+class Done:
+    """An on_done which can be waited for"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.finished = None
+
+    def __call__(self, finished):
+        self.finished = finished
+        self.event.set()
+
+    def wait(self):
+        assert self.event.wait(5), "on_done was never called"
+        return self.finished
+
+
+@pytest.fixture
+def loop():
+    clock = VirtualClock(100.0)
+    sent = Sent(clock)
+    loop = ControlLoop(sent, STEP, clock)
+    loop.sent = sent
+    loop.start()
+    yield loop
+    loop.close()
+    loop.join(5)
+
+
+def test_rows_are_sent_at_their_deadlines(loop):
+    done = Done()
+    schedule = trajectory.line(0.5, 0, 0, 0, 1000, STEP)
+    loop.submit(schedule, done)
+    assert done.wait() is True
+
+    times = np.array([t for t, _ in loop.sent.rows])
+    np.testing.assert_allclose((times - times[0]) * 1000, schedule[:, trajectory.T] - schedule[0, trajectory.T])
+    assert loop.stats()["ticks"] == len(schedule)
+    assert loop.stats()["skipped"] == 0
+
+
+def test_queued_job_starts_one_step_after_the_previous(loop):
+    first, second = Done(), Done()
+    with loop._cond:  # both queued before the loop takes the first
+        loop.submit(trajectory.line(0.5, 0, 0, 0, 500, STEP), first)
+        loop.submit(trajectory.line(0, 0.5, 0, 0, 500, STEP), second)
+    assert first.wait() and second.wait()
+
+    times = [t for t, _ in loop.sent.rows]
+    switch = next(i for i, (_, row) in enumerate(loop.sent.rows) if row[trajectory.VY])
+    assert times[switch] - times[switch - 1] == pytest.approx(STEP / 1000)
+
+
+def test_cancel_resolves_the_job_and_the_queue(loop):
+    cancelled = threading.Event()
+    loop.sent.fail = lambda tick: tick == 5 and not cancelled.is_set() and \
+        (cancelled.set(), threading.Thread(target=loop.cancel).start())
+    playing, queued = Done(), Done()
+    with loop._cond:
+        loop.submit(trajectory.hover(10000, STEP), playing)
+        loop.submit(trajectory.hover(1000, STEP), queued)
+    assert playing.wait() is False
+    assert queued.wait() is False
+    assert len(loop.sent.rows) < 10000 / STEP
+
+
+def test_overlay_is_summed_and_clamped(loop):
+    job, layer = Done(), Done()
+    with loop._cond:
+        loop.submit(trajectory.line(0.6, 0, 0, 0, 1000, STEP), job)
+        loop.overlay(trajectory.line(0.6, 0, 0, 0.3, 500, STEP), layer)
+    assert job.wait() is True and layer.wait() is True
+
+    rows = np.array([row for _, row in loop.sent.rows])
+    assert rows[0, trajectory.VX] == 1  # 0.6 + 0.6 clamped
+    assert rows[0, trajectory.W] == pytest.approx(0.3)
+    assert rows[-1, trajectory.VX] == pytest.approx(0.6)  # the layer has ended
+    assert rows[-1, trajectory.W] == 0
+
+
+def test_layer_alone_is_carried_by_a_hover(loop):
+    layer = Done()
+    loop.overlay(trajectory.line(0, 0, 0, 0.5, 500, STEP), layer)
+    assert layer.wait() is True
+    assert all(row[trajectory.W] == 0.5 for _, row in loop.sent.rows[:-1])
+    assert not loop.busy
+
+
+def test_failing_send_fails_the_job_not_the_loop(loop):
+    failed = []
+
+    def fail(tick):
+        if tick == 3 and not failed:
+            failed.append(tick)
+            raise OSError("link down")
+    loop.sent.fail = fail
+    broken, after = Done(), Done()
+    loop.submit(trajectory.line(0.5, 0, 0, 0, 1000, STEP), broken)
+    assert broken.wait() is False
+    assert loop.stats()["errors"] == 1
+
+    loop.submit(trajectory.line(0.5, 0, 0, 0, 200, STEP), after)
+    assert after.wait() is True
+    assert loop.is_alive()
+
+
+def test_failing_on_done_does_not_stop_the_loop(loop):
+    def broken(finished):
+        raise RuntimeError("callback bug")
+    after = Done()
+    loop.submit(trajectory.hover(200, STEP), broken)
+    loop.submit(trajectory.hover(200, STEP), after)
+    assert after.wait() is True
+    assert loop.is_alive()
+
+
+def test_layer_cancelled_while_ending_is_done_once():
+    loop = ControlLoop(lambda row: None, STEP, VirtualClock())  # not started,_mix is called here
+    calls = []
+    loop.overlay(trajectory.hover(100, STEP), calls.append)
+    row = trajectory.hover(STEP, STEP)[0]
+    loop._mix(row, 0.0)
+
+    class CancelFirst:
+        """The lock of the loop,cancel() gets it first as if it ran right before _mix removes the layer"""
+        def __enter__(self):
+            loop._cond = cond
+            loop.cancel()
+            return cond.__enter__()
+
+        def __exit__(self, *exc):
+            return cond.__exit__(*exc)
+    cond, loop._cond = loop._cond, CancelFirst()
+    loop._mix(row, 1.0)
+    assert calls == [False]
@@ -0,0 +1,59 @@
+import pytest
+from pyardrone.navdata import NavData
+
+import telemetry
+from telemetry import Telemetry, encode
+
+DEMO = {"vx": 120.5, "vy": -40.25, "vz": 3.0, "psi": 91000.0, "theta": -1500.0, "altitude": 130}
+FIELDS = ["demo.%s" % name for name in DEMO]
+
+
+def test_fields_match_pyardrone():
+    data = encode(0x80000001, 42, {"demo": DEMO})
+    nav = NavData(data)
+    sub = Telemetry(verify=True).subscribe("state", *FIELDS)
+    assert sub.telemetry.feed(data, 1.5)
+    assert sub.read()
+    assert sub["state"] == nav.metadata.state
+    for name in DEMO:
+        assert getattr(sub.navdata.demo, name) == getattr(nav.demo, name)
+    assert sub.navdata.metadata.sequence_number == nav.metadata.sequence_number == 42
+    assert sub.time == 1.5
+
+
+def test_missing_block_and_bad_packets():
+    tel = Telemetry(verify=True)
+    sub = tel.subscribe("demo.vx")
+    assert not sub.read()
+    assert tel.feed(encode(1, 1, {}), 0.0)  # no demo block
+    assert sub.read()
+    with pytest.raises(AttributeError):
+        sub.navdata.demo.vx
+    with pytest.raises(AttributeError):
+        sub.navdata.demo.vy  # not subscribed
+
+    data = bytearray(encode(1, 2, {"demo": DEMO}))
+    data[20] ^= 0xff
+    assert not tel.feed(bytes(data), 0.0)  # checksum
+    assert not tel.feed(b"\0" * 32, 0.0)  # header
+    assert not tel.feed(b"\x88\x77", 0.0)  # too short
+    assert (tel.count, tel.errors) == (1, 3)
+
+
+def test_ring_and_late_subscription():
+    tel = Telemetry(capacity=8)
+    vx = tel.subscribe("demo.vx")
+    for i in range(20):
+        tel.feed(encode(1, i, {"demo": {"vx": float(i), "altitude": i}}), i / 10)
+    assert vx.read() and vx["demo.vx"] == 19
+    history = tel.history()
+    assert list(history[:, telemetry.SEQUENCE]) == list(range(13, 20))
+
+    altitude = tel.subscribe("demo.altitude")  # a new ring,the old rows are kept without the new field
+    assert vx.read() and vx["demo.vx"] == 19
+    assert altitude.read()
+    with pytest.raises(AttributeError):
+        altitude.navdata.demo.altitude
+    tel.feed(encode(1, 20, {"demo": {"vx": 20.0, "altitude": 20}}), 2.0)
+    assert altitude.read() and altitude["demo.altitude"] == 20
+    assert vx.read() and vx["demo.vx"] == 20
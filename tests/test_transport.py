@@ -0,0 +1,81 @@
+import re
+
+from pyardrone import at
+
+import transport
+from sim import SimDrone
+from transport import ATTransport
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def now(self):
+        return self.t
+
+
+class Link:
+    def __init__(self, at_client):
+        self.at_client = at_client
+
+    def close(self):
+        pass
+
+
+def _sequences(datagram):
+    return [int(n) for n in re.findall(rb"AT\*[A-Z_]+=(\d+)", datagram)]
+
+
+def test_suppression_and_keepalive(at_client):
+    clock = Clock()
+    link = ATTransport(Link(at_client), keepalive=0.5, clock=clock)
+    link.move(forward=0.2)
+    clock.t = 0.1
+    link.move(forward=0.2)  # unchanged,suppressed
+    clock.t = 0.6
+    link.move(forward=0.2)  # keepalive due
+    link.move(forward=0.3)  # changed
+    link.hover()
+    link.hover()
+    link.takeoff()
+    link.hover()  # the first command after takeoff always goes out
+    assert len(at_client.datagrams) == 6
+    assert link.stats()["suppressed"] == 2
+    assert b"AT*PCMD" in at_client.datagrams[0] and b"AT*REF" in at_client.datagrams[4]
+
+
+def test_sequence_numbers_follow_the_client(at_client):
+    link = ATTransport(Link(at_client), clock=Clock())
+    at_client.sequence_number = 41  # pyardrone's watchdog sent some already
+    link.move(right=0.1)
+    with link.batch():
+        link.hover()
+        link.land()
+        link.send(at.CONFIG("general:navdata_demo", True))
+    assert len(at_client.datagrams) == 2
+    assert _sequences(at_client.datagrams[0]) == [42]
+    assert _sequences(at_client.datagrams[1]) == [43, 44, 45]
+    assert at_client.sequence_number == 45
+    assert link.stats()["commands"] == 4
+
+
+def test_batch_is_split_at_the_datagram_size(at_client):
+    link = ATTransport(Link(at_client), clock=Clock())
+    with link.batch():
+        for i in range(100):
+            link.move(forward=i / 100)
+    assert len(at_client.datagrams) > 1
+    assert all(len(d) <= transport.MAX_DATAGRAM for d in at_client.datagrams)
+    sequences = [n for d in at_client.datagrams for n in _sequences(d)]
+    assert sequences == list(range(1, 101))
+
+
+def test_links_without_at_client_get_calls():
+    sim = SimDrone(takeoff_ms=0)
+    link = ATTransport(sim, clock=Clock())
+    link.move(forward=0.2)
+    link.move(forward=0.2)
+    link.move(right=0.2)
+    assert sim.commands == 2
+    assert sim.cmd == [0.2, 0.0, 0.0, 0.0]
@@ -0,0 +1,267 @@
+"""
+Compile moves into command schedules before the flight starts.
+
+A schedule is a numpy array with one row (t, vx, vy, vz, w) per AT command,
+'t' is the offset in millisecond from the beginning of the move,
+the others are speed percentages ranging from -1 to 1, as in MyDrone.
+
+All the cos/sin and user functions are evaluated here once for the whole move,
+so the control loop does nothing but indexing into the array,
+and the exact command stream can be printed or saved before taking off.
+"""
+import numpy as np
+from math import pi, cos, sin, radians
+
+T, VX, VY, VZ, W = range(5)  # column index
+STEP = 50  # ms between two AT commands
+
+
+def ticks(ms_period, step=STEP):
+    """
+    Offsets of every command of a move lasting ms_period
+    Like the old recursive moves,one command is sent at 0 and the last one at or before ms_period
+    """
+    n = max(int(ms_period // step) + 1, 1)
+    return np.arange(n, dtype=float) * step
+
+
+def _sample(f, t):
+    """
+    Evaluate f over the whole array t at once
+    Functions written with math.cos or 'if' can't take an array,they are called point by point instead
+    """
+    try:
+        y = np.asarray(f(t), dtype=float)
+    except (TypeError, ValueError):
+        y = None
+    if y is not None and y.ndim == 0:
+        return np.full_like(t, y)
+    if y is None or y.shape != t.shape:
+        y = np.fromiter((f(x) for x in t), dtype=float, count=len(t))
+    return y
+
+
+# Basic moves
+# ------------------------------------------------------
+def line(vx, vy, vz, w, ms_period, step=STEP):
+    """Constant speed,the schedule of MyDrone.free_move"""
+    t = ticks(ms_period, step)
+    sch = np.empty((len(t), 5))
+    sch[:, T] = t
+    sch[:, VX:] = (vx, vy, vz, w)
+    return sch
+
+
+def hover(ms_period, step=STEP):
+    """Zero speed,UAV hovers where it is"""
+    return line(0, 0, 0, 0, ms_period, step)
+
+
+def arc(v, rad: float, ms_period, start_angle=0.0, vertical=False, step=STEP, vertical_gain=4):
+    """
+    The schedule of an arc of rad radians lasting ms_period,start_angle is in radians too
+    It's in x-z plane if vertical,otherwise in x-y plane
+    Radius r = (max_v*v) * ms_period / rad,0 radian points to the South and counterclockwise is positive
+    """
+    t = ticks(ms_period, step)
+    cur_ang = rad * (t / ms_period if ms_period else 0 * t) + start_angle
+
+    ccw_flag = -1 if rad < 0 else 1
+    sch = np.zeros((len(t), 5))
+    sch[:, T] = t
+    sch[:, VX] = v * np.cos(cur_ang) * ccw_flag
+    if vertical:
+        # Multiplied by 4 because the max_v is about 4 times the max_v in vertical
+        sch[:, VZ] = vertical_gain * v * np.sin(cur_ang) * ccw_flag
+    else:
+        sch[:, VY] = v * np.sin(cur_ang) * ccw_flag
+    return sch
+
+
+def arc_move(v, r, deg, start_angle=0, vertical=False, max_v=0.01, step=STEP, vertical_gain=4):
+    """The schedule of MyDrone.arc_move,deg and start_angle are in degree"""
+    rad = radians(deg)
+    ms_period = abs(r * rad / (v * max_v))
+    return arc(v, rad, ms_period, radians(start_angle), vertical, step, vertical_gain)
+
+
+def function(f_vx, f_vy, f_vz, ms_period, step=STEP):
+    """
+    The schedule of MyDrone.function_move
+    Functions take time in second
+    """
+    t = ticks(ms_period, step)
+    sec = t / 1000
+    sch = np.zeros((len(t), 5))
+    sch[:, T] = t
+    sch[:, VX] = _sample(f_vx, sec)
+    sch[:, VY] = _sample(f_vy, sec)
+    sch[:, VZ] = _sample(f_vz, sec)
+    return sch
+
+
+def chain(segments, pause=0, step=STEP, blend=0):
+    """
+    Join schedules one after another into a single schedule
+    Each segment begins one step after the last command of the previous one
+
+    :param pause: Milliseconds of hovering between two segments to make the UAV stable
+    :param blend: Milliseconds around every join where the command fades from one segment into the next
+                  instead of jumping,so joined arcs are flown as one smooth path.
+                  The duration and,for constant speeds,the distance are kept. Not used with a pause.
+    """
+    parts = []
+    offset = 0
+    for i, seg in enumerate(segments):
+        if i and pause:
+            parts.append(hover(pause, step))
+        parts.append(seg)
+
+    for i, seg in enumerate(parts):
+        seg = seg.copy()
+        seg[:, T] += offset
+        offset = seg[-1, T] + step
+        parts[i] = seg
+    sch = np.concatenate(parts)
+    if blend and not pause and len(parts) > 1:
+        _blend(sch, np.cumsum([len(p) for p in parts]), blend, step)
+    return sch
+
+
+def _blend(sch, ends, blend, step):
+    """
+    Cross-fade sch in place around the first row of every segment but the first
+    Each side of a join is extended with its command at the join,the fade goes linearly from one to the other
+    and is never longer than the segments on both sides
+
+    :param ends: Index after the last row of every segment
+    """
+    orig = sch.copy()
+    starts = np.concatenate([[0], ends[:-1]])
+    for j in range(1, len(ends)):
+        k = starts[j]
+        t = orig[k, T]
+        half = min(blend / 2, t - orig[starts[j - 1], T], orig[ends[j] - 1, T] + step - t)
+        if half <= 0:
+            continue
+        lo = np.searchsorted(orig[:, T], t - half)
+        hi = np.searchsorted(orig[:, T], t + half)
+        s = ((orig[lo:hi, T] + step / 2 - (t - half)) / (2 * half))[:, None]
+        s = s * s * (3 - 2 * s)  # smoothstep,no kink where the fade begins and ends
+        before = np.where(np.arange(lo, hi)[:, None] < k, orig[lo:hi, VX:], orig[k - 1, VX:])
+        after = np.where(np.arange(lo, hi)[:, None] < k, orig[k, VX:], orig[lo:hi, VX:])
+        sch[lo:hi, VX:] = (1 - s) * before + s * after
+
+
+def adapt(sch, max_step=200, tolerance=0.005):
+    """
+    Drop the rows which hardly change the command,so that the rate is high where the speed changes quickly
+    and low on straight segments.
+    The schedule should be compiled at the highest rate,a row is kept when any speed differs from
+    the last kept row by more than 'tolerance',or 'max_step' ms have passed since it.
+
+    The control loop sends rows at their own 't',so the result can be played as it is.
+    """
+    rows = sch.tolist()
+    keep = np.zeros(len(sch), dtype=bool)
+    keep[[0, -1]] = True
+    last = rows[0]
+    for i in range(1, len(rows) - 1):
+        row = rows[i]
+        if row[T] - last[T] >= max_step or max(abs(a - b) for a, b in zip(row[VX:], last[VX:])) > tolerance:
+            keep[i] = True
+            last = row
+    return sch[keep]
+
+
+def duration(sch):
+    """Milliseconds from the first command to the last one"""
+    return sch[-1, T] - sch[0, T]
+
+
+def path(sch, max_v=0.01, vertical_gain=4):
+    """
+    The ideal route of a schedule,i.e. where UAV would be when each row is sent
+    if it followed every command instantly.
+
+    :return: Array of rows (x, y, z) in meter,x points right,y forward and z up
+    """
+    dt = np.diff(sch[:, T])
+    moved = sch[:-1, VX:W] * dt[:, None] * max_v
+    moved[:, 2] /= vertical_gain
+    pos = np.zeros((len(sch), 3))
+    np.cumsum(moved, axis=0, out=pos[1:])
+    return pos
+
+
+# Shapes
+# ------------------------------------------------------
+# They mirror the shape moving of MyDrone, 'pause' is the settle time between two segments
+# which used to be the time.sleep in move_seq or arc_move. With no pause,'blend' smooths the joins(see chain).
+# 'deg' and 'finish' are the empirical -380 and -200 degrees which make up for the lag of UAV,
+# see calibrate.py for tuning them
+def square(v=0.2, ms_period=600, pause=1500, step=STEP):
+    t = ms_period
+    return chain([line(0, v, 0, 0, t, step),
+                  line(v, 0, 0, 0, t, step),
+                  line(0, -v, 0, 0, t, step),
+                  line(-v, 0, 0, 0, t, step)], pause, step)
+
+
+def triangle(v=0.2, ms_period=800, pause=1500, step=STEP):
+    t = ms_period
+    a1 = radians(60)
+    return chain([line(v*cos(a1), v*sin(a1), 0, 0, t, step),
+                  line(v*cos(a1), -v*sin(a1), 0, 0, t, step),
+                  line(-v, 0, 0, 0, t, step)], pause, step)
+
+
+def circle(v=0.1, r=0.6, vertical=False, max_v=0.01, step=STEP, deg=-380, vertical_gain=4):
+    return arc_move(v, r, deg, 0, vertical, max_v, step, vertical_gain)
+
+
+def two_circle(v=0.1, r=0.6, vertical=False, max_v=0.01, pause=1000, step=STEP, finish=-200, vertical_gain=4,
+               blend=0):
+    return chain([arc_move(v, r, -180, 0, vertical, max_v, step, vertical_gain),
+                  arc_move(v, r, finish, 180, vertical, max_v, step, vertical_gain)], pause, step, blend)
+
+
+def number_eight(v=0.1, r=0.6, max_v=0.01, pause=1000, step=STEP, finish=-200, blend=0):
+    return chain([arc_move(v, r, -180, 0, max_v=max_v, step=step),
+                  arc_move(v, r, 180, 0, max_v=max_v, step=step),
+                  arc_move(v, r, 180, 180, max_v=max_v, step=step),
+                  arc_move(v, r, finish, 180, max_v=max_v, step=step)], pause, step, blend)
+
+
+def spiral_up(v=0.1, r=0.7, max_v=0.01, step=STEP):
+    total_t = 2 * pi * r / (max_v * v)  # This result is in ms
+    total_t *= 4
+    w = v * max_v * 1000 / r
+
+    def fx(t):
+        return -v * np.cos(w * t)
+
+    def fy(t):
+        return v * np.sin(w * t)
+
+    def fz(t):
+        return np.where(t / (total_t/1000) <= 0.5, 0.1, -0.1)
+
+    return function(fx, fy, fz, total_t, step)
+
+
+def star(v=0.1, ms_period=1200, pause=1500, step=STEP):
+    t = ms_period
+    a = radians(36)
+    return chain([line(v*cos(2*a), v*sin(2*a), 0, 0, t, step),
+                  line(v*cos(2*a), -v*sin(2*a), 0, 0, t, step),
+                  line(-v*cos(a), v*sin(a), 0, 0, t, step),
+                  line(v, 0, 0, 0, t, step),
+                  line(-v*cos(a), -v*sin(a), 0, 0, t, step)], pause, step)
+
+
+def four_leaves(v=0.1, r=0.8, max_v=0.01, pause=1500, step=STEP):
+    return chain([arc_move(v, r, 180, 0, max_v=max_v, step=step),
+                  arc_move(v, r, 180, -90, max_v=max_v, step=step),
+                  arc_move(v, r, 180, 180, max_v=max_v, step=step),
+                  arc_move(v, r, 200, 90, max_v=max_v, step=step)], pause, step)
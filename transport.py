@@ -0,0 +1,198 @@
+"""
+AT-command transport between DroneCore and the link to UAV.
+
+* Unchanged move/hover commands are suppressed down to the keepalive rate,
+  so straight segments and key repeats don't flood the link.
+* Commands issued inside 'with transport.batch():' leave in a single UDP datagram,
+  e.g. the hover and land DroneCore.land sends at once.
+* Sequence numbers are taken from pyardrone's own counter under its lock,
+  so they stay consistent with the watchdog thread of pyardrone.
+
+Links without a pyardrone AT client(e.g. sim.SimDrone) get the surviving commands as plain calls,
+so suppression and the statistics work the same in simulation.
+"""
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from clock import MonotonicClock
+
+MAX_DATAGRAM = 1024  # bytes,ARDrone drops longer AT datagrams
+
+
+class ATTransport:
+    """
+    Wraps a link(pyardrone.ARDrone or anything alike) and looks like one
+
+    :param keepalive: Seconds after which an unchanged move is sent again anyway
+    """
+    def __init__(self, link, keepalive=0.5, window=2.0, clock=None):
+        self.link = link
+        self.keepalive = keepalive
+        self.clock = clock or MonotonicClock()
+        self._at_client = getattr(link, "at_client", None)
+
+        self._queue = []
+        self._batching = 0
+        self._lock = threading.RLock()
+        self._last_pcmd = None  # the last movement sent,and when
+        self._last_pcmd_at = 0.0
+
+        # Statistics
+        self.window = window  # seconds covered by the rates of stats()
+        self._sent = deque()  # (time, commands, bytes) of every datagram in the window
+        self.datagrams = 0
+        self.commands = 0
+        self.bytes = 0
+        self.suppressed = 0
+
+    # The interface of a link
+# ------------------------------------------------------
+    @property
+    def state(self):
+        return self.link.state
+
+    @property
+    def navdata(self):
+        return self.link.navdata
+
+    def move(self, *, forward=0, backward=0, left=0, right=0, up=0, down=0, cw=0, ccw=0):
+        pcmd = (float(right - left), float(backward - forward), float(up - down), float(cw - ccw))
+        self._queue_pcmd(pcmd)
+
+    def hover(self):
+        self._queue_pcmd("hover")
+
+    def takeoff(self):
+        self._last_pcmd = None  # the first move after it always goes out
+        self._put(("takeoff", None))
+
+    def land(self):
+        self._last_pcmd = None
+        self._put(("land", None))
+
+    def send(self, command):
+        self._put(("raw", command))
+
+    def close(self):
+        self.flush()
+        self.link.close()
+
+    # Queueing
+# ------------------------------------------------------
+    @contextmanager
+    def batch(self):
+        """Commands issued inside are sent together when the outermost batch exits"""
+        with self._lock:
+            self._batching += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batching -= 1
+                if not self._batching:
+                    self.flush()
+
+    def _queue_pcmd(self, pcmd):
+        """pcmd is (roll, pitch, gaz, yaw),or 'hover'"""
+        with self._lock:
+            now = self.clock.now()
+            if pcmd == self._last_pcmd and now - self._last_pcmd_at < self.keepalive:
+                self.suppressed += 1
+                return
+            self._last_pcmd = pcmd
+            self._last_pcmd_at = now
+            self._put(("pcmd", pcmd))
+
+    def _put(self, item):
+        with self._lock:
+            self._queue.append(item)
+            if not self._batching:
+                self.flush()
+
+    def flush(self):
+        """Send everything queued"""
+        with self._lock:
+            queue, self._queue = self._queue, []
+            if not queue:
+                return
+            if self._at_client is not None:
+                self._send_datagrams(queue)
+            else:
+                self._call_link(queue)
+
+    def _send_datagrams(self, queue):
+        from pyardrone import at
+        commands = []
+        for kind, arg in queue:
+            if kind == "pcmd":
+                if arg == "hover":
+                    commands.append(at.PCMD(flag=0))
+                else:
+                    commands.append(at.PCMD(at.PCMD.flag.progressive, *arg))
+            elif kind == "takeoff":
+                commands.append(at.REF(at.REF.input.start))
+            elif kind == "land":
+                commands.append(at.REF())
+            else:
+                commands.append(arg)
+
+        client = self._at_client
+        with client.sequence_number_mutex:
+            packet = b""
+            count = 0
+            for command in commands:
+                client.sequence_number += 1
+                packed = command._pack(client.sequence_number)
+                if packet and len(packet) + len(packed) > MAX_DATAGRAM:
+                    self._emit(packet, count)
+                    packet, count = b"", 0
+                packet += packed
+                count += 1
+            self._emit(packet, count)
+
+    def _emit(self, packet, count):
+        self._at_client.send_bytes(packet, log=False)
+        self._count(count, len(packet))
+
+    def _call_link(self, queue):
+        for kind, arg in queue:
+            if kind == "pcmd":
+                if arg == "hover":
+                    self.link.hover()
+                else:
+                    roll, pitch, gaz, yaw = arg
+                    self.link.move(right=roll, forward=-pitch, up=gaz, cw=yaw)
+            elif kind == "takeoff":
+                self.link.takeoff()
+            elif kind == "land":
+                self.link.land()
+            else:
+                self.link.send(arg)
+        self._count(len(queue), 0)
+
+    # Statistics
+# ------------------------------------------------------
+    def _count(self, commands, size):
+        now = self.clock.now()
+        self.datagrams += 1
+        self.commands += commands
+        self.bytes += size
+        self._sent.append((now, commands, size))
+        while self._sent and self._sent[0][0] < now - self.window:
+            self._sent.popleft()
+
+    def stats(self):
+        """Totals,and rates per second over the last 'window' seconds"""
+        with self._lock:
+            now = self.clock.now()
+            recent = [s for s in self._sent if s[0] >= now - self.window]
+            return {
+                "datagrams": self.datagrams,
+                "commands": self.commands,
+                "bytes": self.bytes,
+                "suppressed": self.suppressed,
+                "datagrams_per_s": len(recent) / self.window,
+                "commands_per_s": sum(s[1] for s in recent) / self.window,
+                "bytes_per_s": sum(s[2] for s in recent) / self.window,
+            }